@@ -0,0 +1,27 @@
+﻿from typing import List
+from fastapi import APIRouter, HTTPException, Query
+
+from app.schemas.analytics import CohortOut, CohortStatsResponse
+from app.services.analytics import DEFAULT_PERCENTILES, cohort_analytics
+
+router = APIRouter()
+
+
+@router.get("/cohorts", response_model=List[CohortOut])
+def list_cohorts():
+    return cohort_analytics.cohorts()
+
+
+@router.get("/{company_id}/{job_id}", response_model=CohortStatsResponse)
+def cohort_stats(
+    company_id: str,
+    job_id: str,
+    bins: int = Query(default=10, ge=1, le=200),
+    percentiles: List[float] = Query(default=list(DEFAULT_PERCENTILES)),
+):
+    if any(p < 0 or p > 100 for p in percentiles):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+    stats = cohort_analytics.summary(company_id, job_id, percentiles=percentiles, bins=bins)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No answers for this company/job")
+    return stats
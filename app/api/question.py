@@ -1,17 +1,22 @@
-﻿from pathlib import Path
-from typing import Optional
+﻿import asyncio
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-
-from app.schemas.question import QuestionNextRequest, QuestionOut, AnswerSubmitRequest, AnswerAudioResponse
+from fastapi.responses import JSONResponse
+
+from app.schemas.question import (
+    QuestionNextRequest,
+    QuestionOut,
+    AnswerSubmitRequest,
+    AnswerAudioResponse,
+    TranscriptionJobOut,
+)
 from app.core.session_store import session_store
 from app.services.timing_analyzer import record_answer_time
+from app.services.analytics import cohort_analytics
 from app.core.config import settings
+from app.services.transcription_jobs import QueueFullError, QueueStoppedError, TranscriptionJob, transcription_jobs
 
 router = APIRouter()
 
-_LOG_DIR = Path(__file__).resolve().parents[1] / "logs"
-_ANSWER_LOG = _LOG_DIR / "answers.log"
-
 
 @router.post("/next", response_model=QuestionOut)
 def next_question(payload: QuestionNextRequest):
@@ -23,7 +28,15 @@ def next_question(payload: QuestionNextRequest):
     if not question:
         raise HTTPException(status_code=404, detail="No more questions")
 
-    return QuestionOut(**question)
+    # Re-read: background generation may have appended questions while we waited.
+    session = session_store.get_session(payload.session_id) or session
+    total = len(session.questions)
+    return QuestionOut(
+        question_id=question.question_id,
+        text=question.text,
+        total_questions=total,
+        remaining_questions=max(total - session.current_index, 0),
+    )
 
 
 @router.post("/answer")
@@ -31,80 +44,121 @@ def submit_answer(payload: AnswerSubmitRequest):
     session = session_store.get_session(payload.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    question_ids = {q["question_id"] for q in session.questions}
-    if payload.question_id not in question_ids:
+    if not session.has_question(payload.question_id):
         raise HTTPException(status_code=404, detail="Question not found")
     if payload.answer_seconds < 0 or payload.answer_seconds > settings.time_limit_seconds:
         raise HTTPException(status_code=400, detail="answer_seconds out of range")
 
-    record_answer_time(
+    record = record_answer_time(
         session_id=payload.session_id,
         question_id=payload.question_id,
         answer_seconds=payload.answer_seconds,
     )
+    if record:
+        cohort_analytics.record_answer(session, record)
     return {"status": "ok"}
 
 
-@router.post("/answer-audio", response_model=AnswerAudioResponse)
+_JOB_ERRORS = {
+    "not_found": "Session not found",
+    "internal": "Failed to record the answer",
+    "cancelled": "Transcription was cancelled by a server restart; please resubmit",
+}
+
+
+def _job_out(job: TranscriptionJob) -> TranscriptionJobOut:
+    return TranscriptionJobOut(
+        job_id=job.job_id,
+        status=job.status,
+        session_id=job.session_id,
+        question_id=job.question_id,
+        result=job.result,
+        error=_JOB_ERRORS.get(job.error_kind) if job.error_kind else None,
+    )
+
+
+def _accepted(job: TranscriptionJob) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content=_job_out(job).model_dump(),
+        headers={"Location": f"/api/question/answer-audio/jobs/{job.job_id}"},
+    )
+
+
+async def _wait_for(job: TranscriptionJob, timeout: float) -> bool:
+    """Wait up to `timeout` seconds for the job without blocking the event loop."""
+    if job.future.done():
+        return True
+    if timeout <= 0:
+        return False
+    try:
+        # shield: giving up on the wait must not cancel the job itself.
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), timeout)
+    except asyncio.TimeoutError:
+        return False
+    except Exception:
+        pass
+    return True
+
+
+@router.post(
+    "/answer-audio",
+    response_model=AnswerAudioResponse,
+    responses={202: {"model": TranscriptionJobOut}},
+)
 async def submit_answer_audio(
     session_id: str = Form(...),
     question_id: str = Form(...),
     answer_seconds: float = Form(...),
     audio: UploadFile = File(...),
+    async_job: bool = Form(False),
 ):
+    """Transcribe and record an answer.
+
+    The transcript is produced by the STT job queue. If it finishes within
+    `stt_sync_deadline_seconds` the answer is returned as before; otherwise, or
+    when `async_job` is set, the response is 202 with a job to poll.
+    """
     session = session_store.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    question_ids = {q["question_id"] for q in session.questions}
-    if question_id not in question_ids:
+    if not session.has_question(question_id):
         raise HTTPException(status_code=404, detail="Question not found")
     if answer_seconds < 0 or answer_seconds > settings.time_limit_seconds:
         raise HTTPException(status_code=400, detail="answer_seconds out of range")
 
-    transcript = None
-    if settings.openai_api_key:
-        from openai import OpenAI
-
-        client = OpenAI(api_key=settings.openai_api_key)
-        audio.file.seek(0)
-        try:
-            result = client.audio.transcriptions.create(
-                model=settings.openai_stt_model,
-                file=(audio.filename or "answer.webm", audio.file, audio.content_type or "audio/webm"),
-                response_format="text",
-            )
-            transcript = str(result).strip() if result else None
-        except Exception:
-            transcript = None
-
+    data = await audio.read()
     try:
-        _LOG_DIR.mkdir(parents=True, exist_ok=True)
-        _ANSWER_LOG.open("a", encoding="utf-8").write(
-            f"[answer_audio] session_id={session_id} question_id={question_id} "
-            f"seconds={answer_seconds} filename={audio.filename} content_type={audio.content_type} "
-            f"transcript_len={len(transcript or '')}\n"
+        job = transcription_jobs.submit(
+            session_id=session_id,
+            question_id=question_id,
+            answer_seconds=answer_seconds,
+            audio=data,
+            filename=audio.filename,
+            content_type=audio.content_type,
         )
-    except Exception:
-        pass
-
-    if transcript:
-        transcript = transcript.strip()
-    word_count = len(transcript.split()) if transcript else 0
-    wpm = (word_count / (answer_seconds / 60)) if answer_seconds > 0 else 0.0
-
-    session_store.record_answer_for_session(
-        session_id=session_id,
-        question_id=question_id,
-        answer_seconds=answer_seconds,
-        transcript=transcript,
-        word_count=word_count,
-        words_per_min=wpm,
-    )
-
-    return AnswerAudioResponse(
-        session_id=session_id,
-        question_id=question_id,
-        transcript=transcript,
-        answer_seconds=answer_seconds,
-        words_per_min=wpm,
-    )
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Transcription queue is full", headers={"Retry-After": "5"})
+    except QueueStoppedError:
+        raise HTTPException(status_code=503, detail="Server is shutting down", headers={"Retry-After": "5"})
+
+    deadline = 0.0 if async_job else settings.stt_sync_deadline_seconds
+    if not await _wait_for(job, deadline):
+        return _accepted(job)
+    if job.status == "failed":
+        if job.error_kind == "not_found":
+            raise HTTPException(status_code=404, detail=_JOB_ERRORS["not_found"])
+        if job.error_kind == "cancelled":
+            raise HTTPException(status_code=503, detail=_JOB_ERRORS["cancelled"], headers={"Retry-After": "5"})
+        raise HTTPException(status_code=500, detail=_JOB_ERRORS["internal"])
+    return job.result
+
+
+@router.get("/answer-audio/jobs/{job_id}", response_model=TranscriptionJobOut)
+async def get_transcription_job(job_id: str, wait: float = 0.0):
+    """Job status; `wait` long-polls up to that many seconds for the job to finish."""
+    job = transcription_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    await _wait_for(job, min(max(wait, 0.0), settings.stt_long_poll_max_seconds))
+    return _job_out(job)
@@ -1,15 +1,81 @@
-﻿from fastapi import APIRouter, HTTPException
+﻿from typing import Any, Iterator, Optional, Tuple
+import json
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from app.schemas.report import ReportResponse
 from app.core.session_store import session_store
-from app.services.report_builder import build_report
+from app.services.report_builder import get_report, iter_report_events, report_etag
 
 router = APIRouter()
 
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
 @router.get("/{session_id}", response_model=ReportResponse)
-def get_report(session_id: str):
+def get_session_report(
+    session_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+):
     session = session_store.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    report = build_report(session)
+    cached = session.report_cache
+    if cached is not None and cached[0] == session.version:
+        etag = report_etag(cached[0])
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    report, etag = get_report(session)
+    if etag:
+        response.headers["ETag"] = etag
     return report
+
+
+def _cached_events(report: ReportResponse) -> Iterator[Tuple[str, Any]]:
+    summary = report.summary.model_dump(exclude={"summary_lines"})
+    yield "summary", {
+        "session_id": report.session_id,
+        "total_questions": report.total_questions,
+        "answered_questions": report.answered_questions,
+        "summary": summary,
+    }
+    for answer in report.answers:
+        yield "answer", answer
+    yield "summary_lines", report.summary.summary_lines
+
+
+@router.get("/{session_id}/stream")
+def stream_session_report(session_id: str, accept: Optional[str] = Header(default=None)):
+    """Report parts as they complete: NDJSON by default, SSE for `Accept: text/event-stream`."""
+    session = session_store.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    cached = session.report_cache
+    if cached is not None and cached[0] == session.version:
+        events = _cached_events(cached[1])
+    else:
+        # Per-answer calls let each answer stream out as its own call returns.
+        snapshot = session_store.snapshot(session_id) or session.snapshot()
+        events = iter_report_events(snapshot, batch=False)
+
+    sse = bool(accept and "text/event-stream" in accept)
+
+    def body() -> Iterator[str]:
+        for kind, value in events:
+            data = value.model_dump() if hasattr(value, "model_dump") else value
+            if sse:
+                yield f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            else:
+                yield json.dumps({"event": kind, "data": data}, ensure_ascii=False) + "\n"
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
@@ -4,7 +4,11 @@ from fastapi import APIRouter, HTTPException, UploadFile, File
 from app.schemas.session import SessionStartRequest, SessionStartResponse, SessionEndRequest, DocParseResponse
 from app.schemas.question import QuestionOut
 from app.core.session_store import session_store
-from app.services.question_generator import generate_questions
+from app.services.question_generator import (
+    fixed_first_question,
+    generate_questions,
+    generate_remaining_in_background,
+)
 from app.services.company_data import load_company, find_job
 from app.core.config import settings
 from app.services.doc_parser import extract_text_from_upload
@@ -28,15 +32,22 @@ def start_session(payload: SessionStartRequest):
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    questions = generate_questions(
-        company_id=payload.company_id,
-        job_id=payload.job_id,
-        resume_text=payload.resume_text,
-        self_intro_text=payload.self_intro_text,
-        jd_text=payload.jd_text,
-        count=payload.question_count or settings.default_question_count,
-        style=payload.style,
-    )
+    count = payload.question_count or settings.default_question_count
+    background = settings.background_question_generation and count > 1
+    if background:
+        # Hand out the fixed self-introduction now; the rest is generated while
+        # the candidate answers it.
+        questions = [fixed_first_question(payload.style)]
+    else:
+        questions = generate_questions(
+            company_id=payload.company_id,
+            job_id=payload.job_id,
+            resume_text=payload.resume_text,
+            self_intro_text=payload.self_intro_text,
+            jd_text=payload.jd_text,
+            count=count,
+            style=payload.style,
+        )
     session = session_store.create_session(
         company_id=payload.company_id,
         job_id=payload.job_id,
@@ -48,13 +59,28 @@ def start_session(payload: SessionStartRequest):
         tts_instructions=payload.tts_instructions,
         tts_speed=payload.tts_speed,
         questions=questions,
+        questions_pending=background,
     )
+    total_questions = count if background else len(questions)
+    if background:
+        generate_remaining_in_background(
+            session_id=session.session_id,
+            company_id=payload.company_id,
+            job_id=payload.job_id,
+            resume_text=payload.resume_text,
+            self_intro_text=payload.self_intro_text,
+            jd_text=payload.jd_text,
+            count=count,
+            style=payload.style,
+        )
     print(
         "[session_start]",
         "session_id=",
         session.session_id,
         "count=",
-        len(questions),
+        total_questions,
+        "background=",
+        background,
         "style=",
         payload.style,
         "resume_len=",
@@ -67,7 +93,8 @@ def start_session(payload: SessionStartRequest):
     try:
         _LOG_DIR.mkdir(parents=True, exist_ok=True)
         _LOG_FILE.open("a", encoding="utf-8").write(
-            f"[session_start] session_id={session.session_id} count={len(questions)} style={payload.style}\n"
+            f"[session_start] session_id={session.session_id} count={total_questions} "
+            f"background={background} style={payload.style}\n"
         )
         _LOG_FILE.open("a", encoding="utf-8").write(
             f"[session_questions] session_id={session.session_id} questions={ [q['text'] for q in questions] }\n"
@@ -81,8 +108,8 @@ def start_session(payload: SessionStartRequest):
 
     return SessionStartResponse(
         session_id=session.session_id,
-        total_questions=len(session.questions),
-        question=QuestionOut(**first_question),
+        total_questions=total_questions,
+        question=QuestionOut(question_id=first_question.question_id, text=first_question.text),
     )
 
 
@@ -6,6 +6,7 @@ from fastapi.responses import StreamingResponse
 from app.schemas.tts import TtsRequest
 from app.core.session_store import session_store
 from app.core.config import settings
+from app.core.openai_client import get_openai_client
 
 router = APIRouter()
 
@@ -38,8 +39,7 @@ def speak(payload: TtsRequest):
 
     text = payload.text
     if not text and payload.question_id:
-        question_map = {q["question_id"]: q["text"] for q in session.questions}
-        text = question_map.get(payload.question_id)
+        text = session.question_text(payload.question_id)
 
     if not text:
         raise HTTPException(status_code=400, detail="text or question_id required")
@@ -51,9 +51,7 @@ def speak(payload: TtsRequest):
     if not settings.openai_api_key:
         raise HTTPException(status_code=400, detail="OPENAI_API_KEY not set")
 
-    from openai import OpenAI
-
-    client = OpenAI(api_key=settings.openai_api_key)
+    client = get_openai_client("tts")
     response = client.audio.speech.create(
         model=settings.openai_tts_model,
         voice=voice,
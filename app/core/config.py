@@ -1,4 +1,4 @@
-﻿from typing import Optional
+﻿from typing import Dict, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,11 +11,69 @@ class Settings(BaseSettings):
     openai_model: str = "gpt-4o-mini"
     openai_temperature: float = 0.4
     openai_max_output_tokens: int = 512
+    openai_stream_questions: bool = True
+    openai_timeout_seconds: float = 60.0
+    openai_connect_timeout_seconds: float = 5.0
+    openai_question_timeout_seconds: float = 30.0
+    openai_eval_timeout_seconds: float = 30.0
+    openai_stt_timeout_seconds: float = 60.0
+    openai_tts_timeout_seconds: float = 30.0
+    # Slowest generation rate budgeted for completions larger than openai_max_output_tokens.
+    openai_min_output_tokens_per_second: float = 25.0
+    openai_max_retries: int = 2
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry_seconds: float = 30.0
     openai_stt_model: str = "gpt-4o-mini-transcribe"
     openai_eval_model: Optional[str] = None
+    report_batch_feedback: bool = True
+    report_max_workers: int = 8
+    report_call_timeout_seconds: float = 30.0
+    # One deadline for a report's per-answer fallback calls; each call is also bounded by openai_eval_timeout_seconds.
+    report_fallback_deadline_seconds: float = 60.0
+    eager_evaluation: bool = True
+    eager_evaluation_workers: int = 4
+    model_answer_store_path: Optional[str] = None
+    model_answer_cache_size: int = 1024
+    llm_cache_enabled: bool = True
+    llm_cache_size: int = 2048
+    llm_cache_ttl_seconds: int = 86400
+    llm_cache_path: Optional[str] = None
+    llm_cache_disk_max_entries: int = 50000
     openai_tts_model: str = "gpt-4o-mini-tts"
     tts_default_voice: str = "alloy"
     tts_default_speed: float = 1.0
+    question_cache_size: int = 256
+    question_cache_ttl_seconds: int = 600
+    background_question_generation: bool = False
+    question_background_workers: int = 4
+    question_wait_timeout_seconds: float = 30.0
+    question_bank_enabled: bool = True
+    question_bank_path: Optional[str] = None
+    question_bank_personalized_count: int = 2
+    session_store_backend: str = "memory"  # memory | sqlite
+    session_store_path: Optional[str] = None
+    session_store_cache_size: int = 1024
+    # Memory store limits; 0 disables the corresponding limit.
+    session_idle_ttl_seconds: int = 3600
+    session_max_age_seconds: int = 86400
+    session_max_count: int = 10000
+    session_max_bytes: int = 512 * 1024 * 1024
+    session_sweep_interval_seconds: int = 60
+    session_lock_stripes: int = 64
+    session_snapshot_enabled: bool = True
+    session_snapshot_path: Optional[str] = None
+    session_snapshot_interval_seconds: int = 300
+    # Most recent answers kept per company/job cohort for /api/analytics.
+    analytics_window_answers: int = 20000
+    stt_provider: str = "openai"
+    stt_workers: int = 8
+    stt_provider_concurrency: Dict[str, int] = {"openai": 4}
+    stt_queue_size: int = 256
+    # How long /answer-audio waits for a transcript before answering 202 with a job id.
+    stt_sync_deadline_seconds: float = 20.0
+    stt_long_poll_max_seconds: float = 30.0
+    stt_job_ttl_seconds: int = 600
 
 
 settings = Settings()
@@ -0,0 +1,177 @@
+﻿from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+
+_DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+# Expired rows are purged and the table trimmed once every this many writes.
+_DISK_PRUNE_EVERY = 100
+
+
+class LlmResponseCache:
+    """Content-addressed cache of LLM output text: bounded in-memory LRU plus an optional SQLite tier."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        disk_path: Optional[Path] = None,
+        disk_max_entries: int = 0,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._disk_path = disk_path
+        self._disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, temperature: float, system_text: str, user_text: str) -> str:
+        raw = json.dumps([model, temperature, system_text, user_text], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if self._disk_path is None:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                self._disk_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self._disk_path), timeout=5)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_DISK_SCHEMA)
+                conn.commit()
+            except sqlite3.Error as exc:
+                print(f"[llm_cache] disk tier disabled path={self._disk_path} error={exc!r}")
+                self._disk_path = None
+                return None
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, expires_at: float, text: str) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (expires_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+                del self._memory[key]
+
+        conn = self._conn()
+        row = None
+        if conn is not None:
+            try:
+                row = conn.execute(
+                    "SELECT text, expires_at FROM llm_responses WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+        with self._lock:
+            if row:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, row[1], row[0])
+                return row[0]
+            self.misses += 1
+        return None
+
+    def put(self, key: str, text: str, ttl_seconds: Optional[float] = None) -> None:
+        if not text:
+            return
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self._remember(key, expires_at, text)
+            self._writes += 1
+            prune = self._writes % _DISK_PRUNE_EVERY == 0
+
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, text, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, text, now, expires_at),
+            )
+            if prune:
+                conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+                if self._disk_max_entries > 0:
+                    conn.execute(
+                        "DELETE FROM llm_responses WHERE key IN ("
+                        "SELECT key FROM llm_responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self._disk_max_entries,),
+                    )
+            conn.commit()
+        except sqlite3.Error as exc:
+            print(f"[llm_cache] write_failed error={exc!r}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self._disk_path is not None,
+            }
+
+
+llm_cache = LlmResponseCache(
+    max_entries=settings.llm_cache_size,
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    disk_path=Path(settings.llm_cache_path) if settings.llm_cache_path else None,
+    disk_max_entries=settings.llm_cache_disk_max_entries,
+)
+
+
+def cached_completion(
+    model: str,
+    temperature: float,
+    system_text: str,
+    user_text: str,
+    create: Callable[[], Optional[str]],
+    validate: Optional[Callable[[str], bool]] = None,
+) -> Optional[str]:
+    """Return cached output for an identical prompt, otherwise call `create` and cache a valid result."""
+    if not settings.llm_cache_enabled:
+        return create()
+    key = llm_cache.make_key(model, temperature, system_text, user_text)
+    text = llm_cache.get(key)
+    if text is not None:
+        return text
+    text = create()
+    if text and (validate is None or validate(text)):
+        llm_cache.put(key, text)
+    return text
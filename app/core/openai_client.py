@@ -0,0 +1,95 @@
+﻿from typing import Optional
+import threading
+
+from app.core.config import settings
+
+_lock = threading.Lock()
+_client = None
+_async_client = None
+
+
+def _operation_timeout(operation: Optional[str], max_output_tokens: Optional[int] = None) -> Optional[float]:
+    timeout = {
+        "questions": settings.openai_question_timeout_seconds,
+        "evaluation": settings.openai_eval_timeout_seconds,
+        "stt": settings.openai_stt_timeout_seconds,
+        "tts": settings.openai_tts_timeout_seconds,
+    }.get(operation or "")
+    if timeout and max_output_tokens and max_output_tokens > settings.openai_max_output_tokens:
+        # The per-operation timeouts assume a default-sized completion; give larger
+        # ones (batched evaluations) time for the extra tokens.
+        extra_tokens = max_output_tokens - settings.openai_max_output_tokens
+        timeout += extra_tokens / max(settings.openai_min_output_tokens_per_second, 1.0)
+    return timeout
+
+
+def _http_options() -> dict:
+    # Built from the SDK's own exports so this follows whichever HTTP library it ships with.
+    from openai import DEFAULT_CONNECTION_LIMITS, Timeout
+
+    return {
+        "limits": type(DEFAULT_CONNECTION_LIMITS)(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive_connections,
+            keepalive_expiry=settings.openai_keepalive_expiry_seconds,
+        ),
+        "timeout": Timeout(
+            settings.openai_timeout_seconds,
+            connect=settings.openai_connect_timeout_seconds,
+        ),
+    }
+
+
+def get_openai_client(operation: Optional[str] = None, max_output_tokens: Optional[int] = None):
+    """Process-wide OpenAI client; one connection pool shared by every call site."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from openai import DefaultHttpxClient, OpenAI
+
+                options = _http_options()
+                _client = OpenAI(
+                    api_key=settings.openai_api_key,
+                    max_retries=settings.openai_max_retries,
+                    timeout=options["timeout"],
+                    http_client=DefaultHttpxClient(**options),
+                )
+    timeout = _operation_timeout(operation, max_output_tokens)
+    return _client.with_options(timeout=timeout) if timeout else _client
+
+
+def get_async_openai_client(operation: Optional[str] = None, max_output_tokens: Optional[int] = None):
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+                options = _http_options()
+                _async_client = AsyncOpenAI(
+                    api_key=settings.openai_api_key,
+                    max_retries=settings.openai_max_retries,
+                    timeout=options["timeout"],
+                    http_client=DefaultAsyncHttpxClient(**options),
+                )
+    timeout = _operation_timeout(operation, max_output_tokens)
+    return _async_client.with_options(timeout=timeout) if timeout else _async_client
+
+
+def init_openai_clients() -> None:
+    if not settings.openai_api_key:
+        return
+    get_openai_client()
+    get_async_openai_client()
+
+
+async def close_openai_clients() -> None:
+    global _client, _async_client
+    with _lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.close()
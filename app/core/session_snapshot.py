@@ -0,0 +1,304 @@
+﻿from dataclasses import fields
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, Optional
+import gc
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+
+from app.core.config import settings
+from app.core.session_store import AnswerRecord, MemorySessionStore, Question, Session
+from app.utils.transcript_quality import TranscriptQuality
+
+DEFAULT_PATH = Path(__file__).resolve().parents[1] / "data" / "sessions.snapshot"
+
+# Bumped whenever the tuple layout below changes; older snapshots are then ignored.
+# Fields appended at the end are read with a default instead.
+_FORMAT = 1
+_QUALITY_FIELDS = tuple(f.name for f in fields(TranscriptQuality))
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def _encode_answer(record: AnswerRecord) -> tuple:
+    quality = record.quality
+    return (
+        record.question_id,
+        record.answer_seconds,
+        record.transcript,
+        record.word_count,
+        record.words_per_min,
+        record.model_answer,
+        record.feedback,
+        record.recorded_at,
+        tuple(getattr(quality, name) for name in _QUALITY_FIELDS) if quality else None,
+    )
+
+
+def _decode_answer(row: tuple) -> AnswerRecord:
+    return AnswerRecord(
+        question_id=row[0],
+        answer_seconds=row[1],
+        transcript=row[2],
+        word_count=row[3],
+        words_per_min=row[4],
+        model_answer=row[5],
+        feedback=row[6],
+        recorded_at=row[7],
+        # Stored verdicts spare re-running the classifier over every transcript.
+        quality=TranscriptQuality(*row[8]) if row[8] else None,
+    )
+
+
+def encode_session(session: Session) -> tuple:
+    """Sessions are stored as plain tuples: compact, fast to unpickle and independent of class layout."""
+    return (
+        session.session_id,
+        session.company_id,
+        session.job_id,
+        session.resume_text,
+        session.self_intro_text,
+        session.jd_text,
+        session.voice,
+        session.style,
+        session.tts_instructions,
+        session.tts_speed,
+        [(q.question_id, q.text) for q in session.questions],
+        [_encode_answer(r) for r in session.answers.values()],
+        list(session.summary_lines),
+        session.current_index,
+        session.ended,
+        session.version,
+        session.created_at,
+        session.last_access,
+        session.questions_ready is not None and not session.questions_ready.is_set(),
+    )
+
+
+def decode_session(row: tuple) -> Session:
+    session = Session(
+        session_id=row[0],
+        company_id=row[1],
+        job_id=row[2],
+        resume_text=row[3],
+        self_intro_text=row[4],
+        jd_text=row[5],
+        voice=row[6],
+        style=row[7],
+        tts_instructions=row[8],
+        tts_speed=row[9],
+        questions=[Question(question_id=qid, text=sys.intern(text)) for qid, text in row[10]],
+        summary_lines=row[12],
+        current_index=row[13],
+        ended=row[14],
+        version=row[15],
+        created_at=row[16],
+        last_access=row[17],
+    )
+    for answer in row[11]:
+        record = _decode_answer(answer)
+        session.answers[record.question_id] = record
+        session.stats.add(record.answer_seconds, record.words_per_min)
+    if len(row) > 18 and row[18] and not session.ended:
+        # Its background question generation died with the old process and cannot
+        # be resumed; end the session so the client moves on to the report
+        # instead of waiting on questions that will never arrive.
+        session.ended = True
+        session.resume_text = session.self_intro_text = session.jd_text = None
+    return session
+
+
+def _read_deltas(path: Path) -> Iterator[tuple]:
+    try:
+        with path.open("rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+                except (pickle.UnpicklingError, ValueError, IndexError) as exc:
+                    # A crash can leave a torn final record; everything before it is intact.
+                    print(f"[session_snapshot] delta_truncated path={path} error={exc!r}")
+                    return
+    except FileNotFoundError:
+        return
+
+
+class SessionSnapshotter:
+    """Periodic full snapshots of a MemorySessionStore plus an append-only delta log between them.
+
+    Deltas carry absolute state (a whole session, one answer, a question position
+    or a removal), so replaying one that the snapshot already reflects is harmless.
+    """
+
+    def __init__(self, store: MemorySessionStore, path: Path) -> None:
+        self._store = store
+        self._path = path
+        self._delta_path = path.with_name(path.name + ".delta")
+        self._rotated_path = path.with_name(path.name + ".delta.old")
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._delta: Optional[BinaryIO] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # Journal interface used by MemorySessionStore.
+
+    def _append(self, entry: tuple) -> None:
+        data = pickle.dumps(entry, protocol=_PROTOCOL)
+        with self._lock:
+            if self._delta is None:
+                return
+            try:
+                self._delta.write(data)
+                self._delta.flush()
+            except OSError as exc:
+                print(f"[session_snapshot] delta_write_failed error={exc!r}")
+
+    def put(self, session: Session) -> None:
+        self._append(("put", encode_session(session)))
+
+    def answer(self, session_id: str, record: AnswerRecord, version: int) -> None:
+        self._append(("answer", session_id, _encode_answer(record), version))
+
+    def advance(self, session_id: str, current_index: int) -> None:
+        self._append(("advance", session_id, current_index))
+
+    def drop(self, session_id: str) -> None:
+        self._append(("drop", session_id))
+
+    # Snapshot and restore.
+
+    def _apply(self, entry: tuple) -> None:
+        op = entry[0]
+        if op == "put":
+            self._store.restore_session(decode_session(entry[1]))
+        elif op == "answer":
+            self._store.restore_answer(entry[1], _decode_answer(entry[2]), entry[3])
+        elif op == "advance":
+            self._store.restore_position(entry[1], entry[2])
+        elif op == "drop":
+            self._store.forget_session(entry[1])
+
+    def restore(self) -> int:
+        """Load the last snapshot and replay deltas written after it; returns the resident count."""
+        started = time.perf_counter()
+        # Millions of small objects are created here; collection passes would dominate.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            try:
+                with self._path.open("rb") as f:
+                    header, rows = pickle.load(f)
+                if header != ("sessions", _FORMAT):
+                    print(f"[session_snapshot] ignoring snapshot with format={header!r}")
+                    rows = []
+            except FileNotFoundError:
+                rows = []
+            except Exception as exc:
+                print(f"[session_snapshot] snapshot_unreadable path={self._path} error={exc!r}")
+                rows = []
+            for row in rows:
+                self._store.restore_session(decode_session(row))
+            replayed = 0
+            # A rotated log exists only if the process died while writing a snapshot.
+            for path in (self._rotated_path, self._delta_path):
+                for entry in _read_deltas(path):
+                    self._apply(entry)
+                    replayed += 1
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        # The snapshot may predate a lower budget, or sessions may have expired while down.
+        self._store.sweep()
+        self._store.enforce_limits()
+        count = self._store.stats().get("resident", 0)
+        elapsed = time.perf_counter() - started
+        print(
+            f"[session_snapshot] restored sessions={count} snapshot_rows={len(rows)} "
+            f"deltas={replayed} seconds={elapsed:.3f}"
+        )
+        return count
+
+    def snapshot(self) -> int:
+        """Write every resident session to a new snapshot file atomically; returns how many."""
+        with self._snapshot_lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            # Start a fresh log first: changes made while the snapshot is written land
+            # in the new log and are replayed on top of it.
+            with self._lock:
+                if self._delta is not None:
+                    self._delta.close()
+                    if self._rotated_path.exists():
+                        # The previous snapshot never completed; keep both logs until one does.
+                        with self._rotated_path.open("ab") as dst, self._delta_path.open("rb") as src:
+                            shutil.copyfileobj(src, dst)
+                        self._delta_path.unlink()
+                    else:
+                        os.replace(self._delta_path, self._rotated_path)
+                self._delta = self._delta_path.open("ab")
+            started = time.perf_counter()
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                rows = self._store.export_sessions(encode_session)
+                tmp_path = self._path.with_name(self._path.name + ".tmp")
+                with tmp_path.open("wb") as f:
+                    pickle.dump((("sessions", _FORMAT), rows), f, protocol=_PROTOCOL)
+                    f.flush()
+                    os.fsync(f.fileno())
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+            os.replace(tmp_path, self._path)
+            try:
+                self._rotated_path.unlink()
+            except FileNotFoundError:
+                pass
+            print(f"[session_snapshot] wrote sessions={len(rows)} seconds={time.perf_counter() - started:.3f}")
+            return len(rows)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(settings.session_snapshot_interval_seconds):
+            try:
+                self.snapshot()
+            except Exception as exc:
+                print(f"[session_snapshot] snapshot_failed error={exc!r}")
+
+    def start(self) -> None:
+        """Restore, attach the journal to the store and begin periodic snapshots."""
+        self.restore()
+        # Fold the replayed deltas into a fresh snapshot so the logs start empty.
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._delta = self._delta_path.open("ab")
+        self._store.journal = self
+        self.snapshot()
+        if settings.session_snapshot_interval_seconds > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="session-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        try:
+            self.snapshot()
+        finally:
+            self._store.journal = None
+            with self._lock:
+                if self._delta is not None:
+                    self._delta.close()
+                    self._delta = None
+
+
+def create_snapshotter(store: Any) -> Optional[SessionSnapshotter]:
+    """A snapshotter for the in-memory store, or None when it is disabled or not applicable."""
+    if not settings.session_snapshot_enabled or not isinstance(store, MemorySessionStore):
+        return None
+    path = Path(settings.session_snapshot_path) if settings.session_snapshot_path else DEFAULT_PATH
+    return SessionSnapshotter(store, path)
@@ -1,9 +1,36 @@
-﻿from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+﻿from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import copy
+import sys
+import threading
+import time
 import uuid
 
+from app.core.config import settings
+from app.utils.stats import RunningStats
+from app.utils.transcript_quality import TranscriptQuality, assess_transcript
 
-@dataclass
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+@dataclass(slots=True, frozen=True)
+class Question:
+    question_id: str
+    text: str
+
+    @classmethod
+    def from_item(cls, item: dict) -> "Question":
+        # Template and bank questions repeat across sessions; interning shares one copy.
+        return cls(question_id=item["question_id"], text=sys.intern(item["text"]))
+
+
+@dataclass(slots=True)
 class AnswerRecord:
     question_id: str
     answer_seconds: float
@@ -12,9 +39,19 @@ class AnswerRecord:
     words_per_min: float = 0.0
     model_answer: Optional[str] = None
     feedback: Optional[str] = None
+    # In-flight eager evaluation, if one was started when the answer was recorded.
+    evaluation: Optional[Future] = field(default=None, repr=False, compare=False)
+    # Reliability verdict for the transcript, computed once when the answer is recorded.
+    quality: Optional[TranscriptQuality] = field(default=None, repr=False, compare=False)
+    # Identifies this particular recording, so late results for a replaced answer can be dropped.
+    recorded_at: float = field(default_factory=time.time, compare=False)
 
+    def __post_init__(self) -> None:
+        if self.quality is None:
+            self.quality = assess_transcript(self.transcript)
 
-@dataclass
+
+@dataclass(slots=True)
 class Session:
     session_id: str
     company_id: str
@@ -26,16 +63,305 @@ class Session:
     style: Optional[str]
     tts_instructions: Optional[str]
     tts_speed: Optional[float]
-    questions: List[dict]
+    questions: List[Question]
     answers: Dict[str, AnswerRecord] = field(default_factory=dict)
     summary_lines: List[str] = field(default_factory=list)
     current_index: int = 0
     ended: bool = False
+    # Set while the questions after the first are still being generated.
+    questions_ready: Optional[threading.Event] = None
+    # Answer-time/WPM aggregates, maintained by record_answer_for_session.
+    stats: RunningStats = field(default_factory=RunningStats, repr=False, compare=False)
+    # Bumped on every change that can alter the report; keys report_cache and the ETag.
+    version: int = 0
+    report_cache: Optional[Tuple[int, Any]] = field(default=None, repr=False, compare=False)
+    created_at: float = field(default_factory=time.time, compare=False)
+    last_access: float = field(default_factory=time.time, compare=False)
+    # question_id -> position in `questions`.
+    question_index: Dict[str, int] = field(default_factory=dict, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.company_id = sys.intern(self.company_id)
+        self.job_id = sys.intern(self.job_id)
+        self.voice = _intern(self.voice)
+        self.style = _intern(self.style)
+        questions, self.questions = self.questions, []
+        self.add_questions(questions)
+
+    def add_questions(self, questions: Iterable[Question]) -> None:
+        for question in questions:
+            self.question_index[question.question_id] = len(self.questions)
+            self.questions.append(question)
+
+    def has_question(self, question_id: str) -> bool:
+        return question_id in self.question_index
+
+    def question_text(self, question_id: str) -> Optional[str]:
+        index = self.question_index.get(question_id)
+        return self.questions[index].text if index is not None else None
+
+    def snapshot(self) -> "Session":
+        """A copy whose collections no longer change under concurrent writes.
+
+        Answer records are shared with the live session, so evaluations saved
+        through the store still reach them.
+        """
+        clone = copy.copy(self)
+        clone.questions = list(self.questions)
+        clone.question_index = dict(self.question_index)
+        clone.answers = dict(self.answers)
+        clone.summary_lines = list(self.summary_lines)
+        clone.stats = copy.copy(self.stats)
+        return clone
+
+
+def store_answer(session: Session, record: AnswerRecord) -> None:
+    """Put a (re-)recorded answer on the session and keep its running stats in step."""
+    previous = session.answers.get(record.question_id)
+    stale_extremes = False
+    if previous is not None:
+        stale_extremes = session.stats.remove(previous.answer_seconds, previous.words_per_min)
+    session.answers[record.question_id] = record
+    session.stats.add(record.answer_seconds, record.words_per_min)
+    if stale_extremes:
+        session.stats.reset_extremes(a.answer_seconds for a in session.answers.values())
+
+
+def apply_evaluation(record: AnswerRecord, result: Optional[dict]) -> None:
+    if not result:
+        return
+    if result.get("model_answer"):
+        record.model_answer = result["model_answer"]
+    if result.get("feedback"):
+        record.feedback = result["feedback"]
+
+
+class SessionStore(ABC):
+    """Session storage interface. Every mutation of a session goes through these methods."""
+
+    @abstractmethod
+    def create_session(
+        self,
+        company_id: str,
+        job_id: str,
+        resume_text: Optional[str],
+        self_intro_text: Optional[str],
+        jd_text: Optional[str],
+        voice: Optional[str],
+        style: Optional[str],
+        tts_instructions: Optional[str],
+        tts_speed: Optional[float],
+        questions: List[dict],
+        questions_pending: bool = False,
+    ) -> Session:
+        ...
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[Session]:
+        ...
+
+    @abstractmethod
+    def end_session(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def bump_version(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def get_next_question(self, session_id: str) -> Optional[Question]:
+        ...
+
+    @abstractmethod
+    def append_questions(self, session_id: str, questions: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def record_answer_for_session(
+        self,
+        session_id: str,
+        question_id: str,
+        answer_seconds: float,
+        transcript: Optional[str] = None,
+        word_count: int = 0,
+        words_per_min: float = 0.0,
+    ) -> Optional[AnswerRecord]:
+        ...
+
+    @abstractmethod
+    def save_evaluation(
+        self,
+        session_id: str,
+        record: AnswerRecord,
+        result: Optional[dict],
+        bump_version: bool = True,
+    ) -> None:
+        """Store feedback/model answer for `record`; ignored if the answer was re-recorded since.
+
+        Results produced while building a report pass bump_version=False: they
+        are part of that report rather than a change to the session.
+        """
+
+    @abstractmethod
+    def set_summary_lines(self, session_id: str, summary_lines: List[str]) -> None:
+        ...
 
+    @abstractmethod
+    def snapshot(self, session_id: str) -> Optional[Session]:
+        """A consistent point-in-time copy of the session for building its report."""
+
+    @abstractmethod
+    def cache_report(self, session_id: str, version: int, report: Any) -> bool:
+        """Keep a built report on the session, unless the session has moved past `version`."""
+
+    def start_sweeper(self) -> None:
+        """Start background housekeeping, if the backend has any."""
+
+    def stop_sweeper(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+def estimate_session_bytes(session: Session) -> int:
+    """Rough resident size of a session: string payloads plus a fixed cost per object."""
+    size = 800
+    for text in (session.resume_text, session.self_intro_text, session.jd_text, session.tts_instructions):
+        if text:
+            size += sys.getsizeof(text)
+    for question in session.questions:
+        size += 150 + sys.getsizeof(question.text)
+    for record in session.answers.values():
+        size += 300
+        for text in (record.transcript, record.model_answer, record.feedback):
+            if text:
+                size += sys.getsizeof(text)
+    for line in session.summary_lines:
+        size += sys.getsizeof(line)
+    return size
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions in process memory, bounded by TTLs, a session count and an approximate byte budget.
+
+    Sessions are kept in LRU order; a background sweeper drops idle and expired
+    ones, and ended sessions are compacted to what the report still needs.
+    Mutations of one session are serialised by a striped lock, so handlers for
+    different sessions do not contend.
+    """
 
-class SessionStore:
     def __init__(self) -> None:
-        self._sessions: Dict[str, Session] = {}
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        # Guards the session table itself; per-session state is guarded by a stripe lock.
+        self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(max(settings.session_lock_stripes, 1))]
+        self._evicted = {"idle": 0, "expired": 0, "capacity": 0}
+        self._compacted = 0
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Change log for snapshots (app.core.session_snapshot); None when snapshotting is off.
+        self.journal: Any = None
+
+    def _get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_access = time.time()
+            return session
+
+    def _changed(self, session: Session, record: Optional[AnswerRecord] = None) -> None:
+        """Account for a mutation; the caller holds the session's stripe lock.
+
+        `record` is passed when only that answer changed, so the journal logs just the answer.
+        """
+        size = estimate_session_bytes(session)
+        with self._lock:
+            if session.session_id not in self._sessions:
+                return
+            self._total_bytes += size - self._sizes.get(session.session_id, 0)
+            self._sizes[session.session_id] = size
+            self._enforce_limits()
+        if self.journal is not None:
+            if record is not None:
+                self.journal.answer(session.session_id, record, session.version)
+            else:
+                self.journal.put(session)
+
+    def _drop(self, session_id: str, reason: str) -> None:
+        # Caller holds self._lock.
+        self._sessions.pop(session_id, None)
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+        self._evicted[reason] += 1
+        if self.journal is not None:
+            self.journal.drop(session_id)
+
+    def _enforce_limits(self) -> None:
+        # Caller holds self._lock. The most recently used session is never evicted.
+        max_sessions = settings.session_max_count
+        max_bytes = settings.session_max_bytes
+        while len(self._sessions) > 1 and (
+            (max_sessions > 0 and len(self._sessions) > max_sessions)
+            or (max_bytes > 0 and self._total_bytes > max_bytes)
+        ):
+            self._drop(next(iter(self._sessions)), "capacity")
+
+    def enforce_limits(self) -> None:
+        """Evict least recently used sessions until the count and byte budgets hold."""
+        with self._lock:
+            self._enforce_limits()
+
+    def sweep(self) -> int:
+        """Drop sessions past their idle or absolute TTL; returns how many were removed."""
+        now = time.time()
+        idle_ttl = settings.session_idle_ttl_seconds
+        max_age = settings.session_max_age_seconds
+        removed = 0
+        with self._lock:
+            for session_id, session in list(self._sessions.items()):
+                if max_age > 0 and now - session.created_at > max_age:
+                    self._drop(session_id, "expired")
+                elif idle_ttl > 0 and now - session.last_access > idle_ttl:
+                    self._drop(session_id, "idle")
+                else:
+                    continue
+                removed += 1
+        return removed
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(settings.session_sweep_interval_seconds):
+            try:
+                removed = self.sweep()
+                if removed:
+                    print(f"[session_store] swept {removed} session(s) resident={len(self._sessions)}")
+            except Exception as exc:
+                print(f"[session_store] sweep_failed error={exc!r}")
+
+    def start_sweeper(self) -> None:
+        if self._sweeper is not None or settings.session_sweep_interval_seconds <= 0:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        if self._sweeper is None:
+            return
+        self._stop.set()
+        self._sweeper.join(timeout=5)
+        self._sweeper = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident": len(self._sessions),
+                "estimated_bytes": self._total_bytes,
+                "evicted": dict(self._evicted),
+                "compacted": self._compacted,
+            }
 
     def create_session(
         self,
@@ -49,6 +375,7 @@ class SessionStore:
         tts_instructions: Optional[str],
         tts_speed: Optional[float],
         questions: List[dict],
+        questions_pending: bool = False,
     ) -> Session:
         session_id = str(uuid.uuid4())
         session = Session(
@@ -62,29 +389,75 @@ class SessionStore:
             style=style,
             tts_instructions=tts_instructions,
             tts_speed=tts_speed,
-            questions=questions,
+            questions=[Question.from_item(q) for q in questions],
+            questions_ready=threading.Event() if questions_pending else None,
         )
-        self._sessions[session_id] = session
+        with self._lock:
+            self._sessions[session_id] = session
+        with self._stripe(session_id):
+            self._changed(session)
         return session
 
     def get_session(self, session_id: str) -> Optional[Session]:
-        return self._sessions.get(session_id)
+        return self._get(session_id)
+
+    def _stripe(self, session_id: str) -> threading.Lock:
+        return self._stripes[hash(session_id) % len(self._stripes)]
 
     def end_session(self, session_id: str) -> None:
-        session = self._sessions.get(session_id)
-        if session:
+        session = self._get(session_id)
+        if not session:
+            return
+        with self._stripe(session_id):
             session.ended = True
+            session.version += 1
+            # Only the report is served from here on; the application texts are not needed.
+            session.resume_text = session.self_intro_text = session.jd_text = None
+            session.questions_ready = None
+            self._changed(session)
+        with self._lock:
+            self._compacted += 1
+
+    def bump_version(self, session_id: str) -> None:
+        session = self._get(session_id)
+        if session:
+            with self._stripe(session_id):
+                session.version += 1
+                self._changed(session)
 
-    def get_next_question(self, session_id: str) -> Optional[dict]:
-        session = self._sessions.get(session_id)
+    def _advance(self, session: Session) -> Optional[Question]:
+        with self._stripe(session.session_id):
+            if session.current_index >= len(session.questions):
+                return None
+            question = session.questions[session.current_index]
+            session.current_index += 1
+            if self.journal is not None:
+                self.journal.advance(session.session_id, session.current_index)
+            return question
+
+    def get_next_question(self, session_id: str) -> Optional[Question]:
+        session = self._get(session_id)
         if not session:
             return None
-        if session.current_index >= len(session.questions):
-            return None
-        question = session.questions[session.current_index]
-        session.current_index += 1
+        question = self._advance(session)
+        ready = session.questions_ready
+        if question is None and ready is not None:
+            # Wait outside the lock; the generator thread needs it to append.
+            ready.wait(settings.question_wait_timeout_seconds)
+            question = self._advance(session)
         return question
 
+    def append_questions(self, session_id: str, questions: List[dict]) -> None:
+        session = self._get(session_id)
+        if not session:
+            return
+        with self._stripe(session_id):
+            session.add_questions(Question.from_item(q) for q in questions)
+            session.version += 1
+            if session.questions_ready is not None:
+                session.questions_ready.set()
+            self._changed(session)
+
     def record_answer_for_session(
         self,
         session_id: str,
@@ -93,17 +466,109 @@ class SessionStore:
         transcript: Optional[str] = None,
         word_count: int = 0,
         words_per_min: float = 0.0,
-    ) -> None:
-        session = self._sessions.get(session_id)
+    ) -> Optional[AnswerRecord]:
+        session = self._get(session_id)
         if not session:
-            return
-        session.answers[question_id] = AnswerRecord(
+            return None
+        record = AnswerRecord(
             question_id=question_id,
             answer_seconds=answer_seconds,
             transcript=transcript,
             word_count=word_count,
             words_per_min=words_per_min,
         )
+        with self._stripe(session_id):
+            store_answer(session, record)
+            session.version += 1
+            self._changed(session, record)
+        return record
+
+    def save_evaluation(
+        self,
+        session_id: str,
+        record: AnswerRecord,
+        result: Optional[dict],
+        bump_version: bool = True,
+    ) -> None:
+        session = self._get(session_id)
+        if not session or not result:
+            return
+        with self._stripe(session_id):
+            apply_evaluation(record, result)
+            if session.answers.get(record.question_id) is record:
+                if bump_version:
+                    session.version += 1
+                self._changed(session, record)
+
+    def set_summary_lines(self, session_id: str, summary_lines: List[str]) -> None:
+        session = self._get(session_id)
+        if session:
+            with self._stripe(session_id):
+                session.summary_lines = summary_lines
+                self._changed(session)
+
+    def snapshot(self, session_id: str) -> Optional[Session]:
+        session = self._get(session_id)
+        if not session:
+            return None
+        with self._stripe(session_id):
+            return session.snapshot()
+
+    def cache_report(self, session_id: str, version: int, report: Any) -> bool:
+        session = self._get(session_id)
+        if not session:
+            return False
+        with self._stripe(session_id):
+            if session.version != version:
+                return False
+            session.report_cache = (version, report)
+            return True
+
+    def export_sessions(self, encode: Callable[[Session], Any]) -> List[Any]:
+        """`encode` applied to every resident session under its lock, for snapshotting."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        rows = []
+        for session in sessions:
+            with self._stripe(session.session_id):
+                rows.append(encode(session))
+        return rows
+
+    def restore_session(self, session: Session) -> None:
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            size = estimate_session_bytes(session)
+            self._total_bytes += size - self._sizes.get(session.session_id, 0)
+            self._sizes[session.session_id] = size
+
+    def restore_answer(self, session_id: str, record: AnswerRecord, version: int) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None:
+            store_answer(session, record)
+            session.version = version
+
+    def restore_position(self, session_id: str, current_index: int) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None:
+            session.current_index = current_index
+
+    def forget_session(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions.pop(session_id)
+                self._total_bytes -= self._sizes.pop(session_id, 0)
+
+
+def _create_store() -> SessionStore:
+    if settings.session_store_backend == "sqlite":
+        from app.core.sqlite_session_store import DEFAULT_PATH, SqliteSessionStore
+
+        path = Path(settings.session_store_path) if settings.session_store_path else DEFAULT_PATH
+        return SqliteSessionStore(path, settings.session_store_cache_size)
+    return MemorySessionStore()
 
 
-session_store = SessionStore()
+session_store = _create_store()
@@ -0,0 +1,449 @@
+﻿from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.session_store import AnswerRecord, Question, Session, SessionStore, apply_evaluation, store_answer
+
+DEFAULT_PATH = Path(__file__).resolve().parents[1] / "data" / "sessions.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    company_id TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    resume_text TEXT,
+    self_intro_text TEXT,
+    jd_text TEXT,
+    voice TEXT,
+    style TEXT,
+    tts_instructions TEXT,
+    tts_speed REAL,
+    current_index INTEGER NOT NULL DEFAULT 0,
+    ended INTEGER NOT NULL DEFAULT 0,
+    questions_pending INTEGER NOT NULL DEFAULT 0,
+    summary_lines TEXT NOT NULL DEFAULT '[]',
+    version INTEGER NOT NULL DEFAULT 0,
+    revision INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    session_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    question_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (session_id, position)
+);
+CREATE TABLE IF NOT EXISTS answers (
+    session_id TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    answer_seconds REAL NOT NULL,
+    transcript TEXT,
+    word_count INTEGER NOT NULL DEFAULT 0,
+    words_per_min REAL NOT NULL DEFAULT 0,
+    model_answer TEXT,
+    feedback TEXT,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (session_id, question_id)
+);
+"""
+
+_SELECT_REVISION = "SELECT revision FROM sessions WHERE session_id = ?"
+_SELECT_SESSION = (
+    "SELECT company_id, job_id, resume_text, self_intro_text, jd_text, voice, style, tts_instructions, "
+    "tts_speed, current_index, ended, summary_lines, version, revision FROM sessions WHERE session_id = ?"
+)
+_SELECT_QUESTIONS = "SELECT question_id, text FROM questions WHERE session_id = ? ORDER BY position"
+_SELECT_ANSWERS = (
+    "SELECT question_id, answer_seconds, transcript, word_count, words_per_min, model_answer, feedback, recorded_at "
+    "FROM answers WHERE session_id = ?"
+)
+_INSERT_SESSION = (
+    "INSERT INTO sessions (session_id, company_id, job_id, resume_text, self_intro_text, jd_text, voice, style, "
+    "tts_instructions, tts_speed, questions_pending, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_QUESTION = "INSERT INTO questions (session_id, position, question_id, text) VALUES (?, ?, ?, ?)"
+_UPSERT_ANSWER = (
+    "INSERT OR REPLACE INTO answers (session_id, question_id, answer_seconds, transcript, word_count, "
+    "words_per_min, model_answer, feedback, recorded_at) VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, ?)"
+)
+_UPDATE_EVALUATION = (
+    "UPDATE answers SET model_answer = COALESCE(?, model_answer), feedback = COALESCE(?, feedback) "
+    "WHERE session_id = ? AND question_id = ? AND recorded_at = ?"
+)
+# `version` tracks changes that alter the report; `revision` tracks every write
+# and is what per-worker caches are validated against.
+_BUMP = "UPDATE sessions SET version = version + ?, revision = revision + 1 WHERE session_id = ?"
+_SELECT_VERSIONS = "SELECT version, revision FROM sessions WHERE session_id = ?"
+
+# How often a worker re-checks for questions another worker is still generating.
+_QUESTION_POLL_SECONDS = 0.2
+
+
+class SqliteSessionStore(SessionStore):
+    """Sessions in SQLite (WAL), shared by every worker process.
+
+    Each worker keeps recently used sessions in memory and revalidates them with
+    a primary-key lookup of the session's revision before returning them.
+    """
+
+    def __init__(self, path: Path, cache_size: int) -> None:
+        self._path = path
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[int, Session]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cached": len(self._cache)}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._path), timeout=10, isolation_level=None, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, session_id: str, content: bool = True) -> Tuple[int, int]:
+        conn.execute(_BUMP, (1 if content else 0, session_id))
+        return conn.execute(_SELECT_VERSIONS, (session_id,)).fetchone()
+
+    def _cache_put(self, session_id: str, revision: int, session: Session) -> None:
+        if self._cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[session_id] = (revision, session)
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _update_cached(
+        self,
+        session_id: str,
+        version: int,
+        revision: int,
+        mutate: Optional[Callable[[Session], None]] = None,
+    ) -> None:
+        """Apply a committed write to the cached copy, or drop it if another writer got in between."""
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is None:
+                return
+            if cached[0] != revision - 1:
+                del self._cache[session_id]
+                return
+            session = cached[1]
+            self._cache[session_id] = (revision, session)
+            session.version = version
+            if mutate is not None:
+                mutate(session)
+
+    def _load(self, conn: sqlite3.Connection, session_id: str) -> Optional[Tuple[int, Session]]:
+        row = conn.execute(_SELECT_SESSION, (session_id,)).fetchone()
+        if not row:
+            return None
+        questions = [
+            Question.from_item({"question_id": question_id, "text": text})
+            for question_id, text in conn.execute(_SELECT_QUESTIONS, (session_id,))
+        ]
+        session = Session(
+            session_id=session_id,
+            company_id=row[0],
+            job_id=row[1],
+            resume_text=row[2],
+            self_intro_text=row[3],
+            jd_text=row[4],
+            voice=row[5],
+            style=row[6],
+            tts_instructions=row[7],
+            tts_speed=row[8],
+            questions=questions,
+            current_index=row[9],
+            ended=bool(row[10]),
+            summary_lines=json.loads(row[11]),
+            version=row[12],
+        )
+        for answer in conn.execute(_SELECT_ANSWERS, (session_id,)):
+            store_answer(
+                session,
+                AnswerRecord(
+                    question_id=answer[0],
+                    answer_seconds=answer[1],
+                    transcript=answer[2],
+                    word_count=answer[3],
+                    words_per_min=answer[4],
+                    model_answer=answer[5],
+                    feedback=answer[6],
+                    recorded_at=answer[7],
+                ),
+            )
+        return row[13], session
+
+    def create_session(
+        self,
+        company_id: str,
+        job_id: str,
+        resume_text: Optional[str],
+        self_intro_text: Optional[str],
+        jd_text: Optional[str],
+        voice: Optional[str],
+        style: Optional[str],
+        tts_instructions: Optional[str],
+        tts_speed: Optional[float],
+        questions: List[dict],
+        questions_pending: bool = False,
+    ) -> Session:
+        session_id = str(uuid.uuid4())
+        with self._transaction() as conn:
+            conn.execute(
+                _INSERT_SESSION,
+                (
+                    session_id,
+                    company_id,
+                    job_id,
+                    resume_text,
+                    self_intro_text,
+                    jd_text,
+                    voice,
+                    style,
+                    tts_instructions,
+                    tts_speed,
+                    int(questions_pending),
+                    time.time(),
+                ),
+            )
+            conn.executemany(
+                _INSERT_QUESTION,
+                [(session_id, i, q["question_id"], q["text"]) for i, q in enumerate(questions)],
+            )
+        session = Session(
+            session_id=session_id,
+            company_id=company_id,
+            job_id=job_id,
+            resume_text=resume_text,
+            self_intro_text=self_intro_text,
+            jd_text=jd_text,
+            voice=voice,
+            style=style,
+            tts_instructions=tts_instructions,
+            tts_speed=tts_speed,
+            questions=[Question.from_item(q) for q in questions],
+        )
+        self._cache_put(session_id, 0, session)
+        return session
+
+    def get_session(self, session_id: str) -> Optional[Session]:
+        conn = self._conn()
+        row = conn.execute(_SELECT_REVISION, (session_id,)).fetchone()
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if row is None:
+                self._cache.pop(session_id, None)
+                return None
+            if cached is not None and cached[0] == row[0]:
+                self._cache.move_to_end(session_id)
+                return cached[1]
+
+        loaded = self._load(conn, session_id)
+        if loaded is None:
+            return None
+        revision, session = loaded
+        if cached is not None:
+            # Worker-local state survives a reload: in-flight evaluations and the built report.
+            session.report_cache = cached[1].report_cache
+            for question_id, record in session.answers.items():
+                old = cached[1].answers.get(question_id)
+                if old is not None and old.recorded_at == record.recorded_at:
+                    record.evaluation = old.evaluation
+        self._cache_put(session_id, revision, session)
+        return session
+
+    def end_session(self, session_id: str) -> None:
+        with self._transaction() as conn:
+            # Ended sessions only serve the report, so the application texts are dropped.
+            if conn.execute(
+                "UPDATE sessions SET ended = 1, resume_text = NULL, self_intro_text = NULL, jd_text = NULL "
+                "WHERE session_id = ?",
+                (session_id,),
+            ).rowcount == 0:
+                return
+            version, revision = self._bump(conn, session_id)
+
+        def mutate(session: Session) -> None:
+            session.ended = True
+            session.resume_text = session.self_intro_text = session.jd_text = None
+
+        self._update_cached(session_id, version, revision, mutate)
+
+    def bump_version(self, session_id: str) -> None:
+        with self._transaction() as conn:
+            versions = self._bump(conn, session_id)
+        if versions:
+            self._update_cached(session_id, *versions)
+
+    def _advance(self, session_id: str) -> Tuple[Optional[Question], bool]:
+        """Hand out the next question atomically; also reports whether more are still being generated."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT current_index, questions_pending FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if not row:
+                return None, False
+            index, pending = row
+            question = conn.execute(
+                "SELECT question_id, text FROM questions WHERE session_id = ? AND position = ?",
+                (session_id, index),
+            ).fetchone()
+            if not question:
+                return None, bool(pending)
+            conn.execute("UPDATE sessions SET current_index = ? WHERE session_id = ?", (index + 1, session_id))
+            version, revision = self._bump(conn, session_id, content=False)
+
+        def mutate(session: Session) -> None:
+            session.current_index = index + 1
+
+        self._update_cached(session_id, version, revision, mutate)
+        return Question.from_item({"question_id": question[0], "text": question[1]}), False
+
+    def get_next_question(self, session_id: str) -> Optional[Question]:
+        question, pending = self._advance(session_id)
+        # The remaining questions may be generated by another worker; poll until they land.
+        deadline = time.monotonic() + settings.question_wait_timeout_seconds
+        while question is None and pending and time.monotonic() < deadline:
+            time.sleep(_QUESTION_POLL_SECONDS)
+            question, pending = self._advance(session_id)
+        return question
+
+    def append_questions(self, session_id: str, questions: List[dict]) -> None:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM questions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            start = row[0]
+            conn.executemany(
+                _INSERT_QUESTION,
+                [(session_id, start + i, q["question_id"], q["text"]) for i, q in enumerate(questions)],
+            )
+            if conn.execute(
+                "UPDATE sessions SET questions_pending = 0 WHERE session_id = ?", (session_id,)
+            ).rowcount == 0:
+                return
+            version, revision = self._bump(conn, session_id)
+        self._update_cached(
+            session_id,
+            version,
+            revision,
+            lambda session: session.add_questions(Question.from_item(q) for q in questions),
+        )
+
+    def record_answer_for_session(
+        self,
+        session_id: str,
+        question_id: str,
+        answer_seconds: float,
+        transcript: Optional[str] = None,
+        word_count: int = 0,
+        words_per_min: float = 0.0,
+    ) -> Optional[AnswerRecord]:
+        record = AnswerRecord(
+            question_id=question_id,
+            answer_seconds=answer_seconds,
+            transcript=transcript,
+            word_count=word_count,
+            words_per_min=words_per_min,
+        )
+        with self._transaction() as conn:
+            if not conn.execute(_SELECT_REVISION, (session_id,)).fetchone():
+                return None
+            conn.execute(
+                _UPSERT_ANSWER,
+                (session_id, question_id, answer_seconds, transcript, word_count, words_per_min, record.recorded_at),
+            )
+            version, revision = self._bump(conn, session_id)
+        self._update_cached(session_id, version, revision, lambda session: store_answer(session, record))
+        return record
+
+    def save_evaluation(
+        self,
+        session_id: str,
+        record: AnswerRecord,
+        result: Optional[dict],
+        bump_version: bool = True,
+    ) -> None:
+        if not result:
+            return
+        apply_evaluation(record, result)
+        with self._transaction() as conn:
+            updated = conn.execute(
+                _UPDATE_EVALUATION,
+                (
+                    result.get("model_answer") or None,
+                    result.get("feedback") or None,
+                    session_id,
+                    record.question_id,
+                    record.recorded_at,
+                ),
+            ).rowcount
+            if not updated:
+                return
+            version, revision = self._bump(conn, session_id, content=bump_version)
+
+        def mutate(session: Session) -> None:
+            cached = session.answers.get(record.question_id)
+            if cached is not None and cached is not record and cached.recorded_at == record.recorded_at:
+                apply_evaluation(cached, result)
+
+        self._update_cached(session_id, version, revision, mutate)
+
+    def set_summary_lines(self, session_id: str, summary_lines: List[str]) -> None:
+        with self._transaction() as conn:
+            if conn.execute(
+                "UPDATE sessions SET summary_lines = ? WHERE session_id = ?",
+                (json.dumps(summary_lines, ensure_ascii=False), session_id),
+            ).rowcount == 0:
+                return
+            version, revision = self._bump(conn, session_id, content=False)
+
+        def mutate(session: Session) -> None:
+            session.summary_lines = summary_lines
+
+        self._update_cached(session_id, version, revision, mutate)
+
+    def snapshot(self, session_id: str) -> Optional[Session]:
+        session = self.get_session(session_id)
+        if not session:
+            return None
+        with self._lock:
+            return session.snapshot()
+
+    def cache_report(self, session_id: str, version: int, report: Any) -> bool:
+        # Validate against the database so a write from another worker is not missed.
+        session = self.get_session(session_id)
+        with self._lock:
+            if session is None or session.version != version:
+                return False
+            session.report_cache = (version, report)
+            return True
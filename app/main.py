@@ -1,8 +1,37 @@
-﻿from fastapi import FastAPI
+﻿from contextlib import asynccontextmanager
+import asyncio
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import session, question, report, tts
+from app.api import session, question, report, tts, analytics
+from app.core.openai_client import init_openai_clients, close_openai_clients
+from app.core.llm_cache import llm_cache
+from app.core.session_store import session_store
+from app.core.session_snapshot import create_snapshotter
+from app.services.analytics import cohort_analytics
+from app.services.prompt_builder import prompt_metrics
+from app.services.transcription_jobs import transcription_jobs
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_openai_clients()
+    snapshotter = create_snapshotter(session_store)
+    if snapshotter is not None:
+        snapshotter.start()
+        # Cohort analytics live in process memory; refill them from the restored sessions.
+        session_store.export_sessions(cohort_analytics.record_session)
+    session_store.start_sweeper()
+    yield
+    # Waits for running transcriptions; keep the event loop free meanwhile.
+    await asyncio.to_thread(transcription_jobs.stop)
+    session_store.stop_sweeper()
+    if snapshotter is not None:
+        snapshotter.stop()
+    await close_openai_clients()
 
-app = FastAPI(title="Interview Trainer API")
+
+app = FastAPI(title="Interview Trainer API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,8 +45,19 @@ app.include_router(session.router, prefix="/api/session", tags=["session"])
 app.include_router(question.router, prefix="/api/question", tags=["question"])
 app.include_router(report.router, prefix="/api/report", tags=["report"])
 app.include_router(tts.router, prefix="/api/tts", tags=["tts"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "llm_cache": llm_cache.stats(),
+        "prompts": prompt_metrics.stats(),
+        "sessions": session_store.stats(),
+        "transcription": transcription_jobs.stats(),
+    }
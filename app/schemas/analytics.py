@@ -0,0 +1,29 @@
+﻿from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class Histogram(BaseModel):
+    edges: List[float]
+    counts: List[int]
+
+
+class Distribution(BaseModel):
+    mean: float
+    std_dev: float
+    min: float
+    max: float
+    percentiles: Dict[str, float]
+    histogram: Histogram
+
+
+class CohortOut(BaseModel):
+    company_id: str
+    job_id: str
+    sessions: int
+    answers: int
+
+
+class CohortStatsResponse(CohortOut):
+    reliable_rate: float
+    answer_seconds: Optional[Distribution] = None
+    words_per_min: Optional[Distribution] = None
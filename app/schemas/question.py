@@ -7,6 +7,10 @@ class QuestionOut(BaseModel):
     question_id: str
     text: str
     time_limit_seconds: int = Field(default_factory=lambda: settings.time_limit_seconds)
+    # Filled in by /next with the session's actual question count, which can be
+    # lower than the total promised at start when questions are generated in the background.
+    total_questions: Optional[int] = None
+    remaining_questions: Optional[int] = None
 
 
 class QuestionNextRequest(BaseModel):
@@ -25,3 +29,12 @@ class AnswerAudioResponse(BaseModel):
     transcript: Optional[str] = None
     answer_seconds: float
     words_per_min: float
+
+
+class TranscriptionJobOut(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    session_id: str
+    question_id: str
+    result: Optional[AnswerAudioResponse] = None
+    error: Optional[str] = None
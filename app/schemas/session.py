@@ -18,6 +18,8 @@ class SessionStartRequest(BaseModel):
 
 class SessionStartResponse(BaseModel):
     session_id: str
+    # With background generation this is the requested count, an upper bound:
+    # generation may produce fewer. /next reports the actual count.
     total_questions: int
     question: QuestionOut
 
@@ -0,0 +1,175 @@
+﻿from typing import Dict, List, Optional, Sequence, Tuple
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+
+_INITIAL_CAPACITY = 256
+# Summaries are memoised per cohort and query; the memo is reset past this size.
+_MAX_CACHED_RESULTS = 256
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+
+
+class _CohortSeries:
+    """Columnar answer metrics for one company/job, in NumPy ring buffers.
+
+    Each (session, question) owns one slot, so a re-recorded answer is updated
+    in place rather than counted twice. Once `window` answers are held, a new
+    answer takes the slot of the oldest one.
+    """
+
+    def __init__(self, window: int) -> None:
+        self.window = max(1, window)
+        self.size = 0
+        self.next_slot = 0
+        self.version = 0
+        capacity = min(_INITIAL_CAPACITY, self.window)
+        self.seconds = np.empty(capacity, dtype=np.float64)
+        self.wpm = np.empty(capacity, dtype=np.float64)
+        self.reliable = np.empty(capacity, dtype=np.bool_)
+        self.keys: List[Optional[Tuple[str, str]]] = [None] * capacity
+        self.slots: Dict[Tuple[str, str], int] = {}
+        # Answers held per session, so evicting a session's last answer drops it from the count.
+        self.sessions: Dict[str, int] = {}
+
+    def _grow(self) -> None:
+        capacity = min(len(self.seconds) * 2, self.window)
+        for name in ("seconds", "wpm", "reliable"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+        self.keys.extend([None] * (capacity - len(self.keys)))
+
+    def _evict(self, slot: int) -> None:
+        key = self.keys[slot]
+        if key is None:
+            return
+        del self.slots[key]
+        remaining = self.sessions[key[0]] - 1
+        if remaining:
+            self.sessions[key[0]] = remaining
+        else:
+            del self.sessions[key[0]]
+
+    def put(self, session_id: str, question_id: str, seconds: float, wpm: float, reliable: bool) -> None:
+        key = (session_id, question_id)
+        slot = self.slots.get(key)
+        if slot is None:
+            if self.size == len(self.seconds) and self.size < self.window:
+                self._grow()
+            if self.size < len(self.seconds):
+                slot = self.size
+                self.size += 1
+            else:
+                slot = self.next_slot
+                self.next_slot = (slot + 1) % self.window
+                self._evict(slot)
+            self.keys[slot] = key
+            self.slots[key] = slot
+            self.sessions[session_id] = self.sessions.get(session_id, 0) + 1
+        self.seconds[slot] = seconds
+        self.wpm[slot] = wpm
+        self.reliable[slot] = reliable
+        self.version += 1
+
+
+def _distribution(values: np.ndarray, percentiles: Sequence[float], bins: int) -> Optional[dict]:
+    if values.size == 0:
+        return None
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        "mean": float(values.mean()),
+        "std_dev": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {f"p{p:g}": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))},
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+class CohortAnalytics:
+    """Answer-time, WPM and reliability aggregates across sessions, per company_id/job_id.
+
+    Each cohort keeps its most recent `analytics_window_answers` answers. The
+    state lives in process memory: every worker aggregates only the answers it
+    recorded itself, and a restart starts from whatever sessions are restored.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cohorts: Dict[Tuple[str, str], _CohortSeries] = {}
+        self._results: Dict[Tuple[str, str, Tuple[float, ...], int], Tuple[int, dict]] = {}
+
+    def record_answer(self, session, record) -> None:
+        key = (session.company_id, session.job_id)
+        with self._lock:
+            series = self._cohorts.get(key)
+            if series is None:
+                series = self._cohorts[key] = _CohortSeries(settings.analytics_window_answers)
+            series.put(
+                session.session_id,
+                record.question_id,
+                record.answer_seconds,
+                record.words_per_min,
+                bool(record.quality.reliable) if record.quality else False,
+            )
+
+    def record_session(self, session) -> None:
+        """Record every answer of a session, oldest first; used to refill after a restore."""
+        for record in sorted(session.answers.values(), key=lambda r: r.recorded_at):
+            self.record_answer(session, record)
+
+    def cohorts(self) -> List[dict]:
+        with self._lock:
+            return [
+                {
+                    "company_id": company_id,
+                    "job_id": job_id,
+                    "sessions": len(series.sessions),
+                    "answers": series.size,
+                }
+                for (company_id, job_id), series in sorted(self._cohorts.items())
+            ]
+
+    def summary(
+        self,
+        company_id: str,
+        job_id: str,
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+        bins: int = 10,
+    ) -> Optional[dict]:
+        percentiles = tuple(float(p) for p in percentiles)
+        with self._lock:
+            series = self._cohorts.get((company_id, job_id))
+            if series is None:
+                return None
+            result_key = (company_id, job_id, percentiles, bins)
+            cached = self._results.get(result_key)
+            if cached is not None and cached[0] == series.version:
+                return cached[1]
+            version = series.version
+            sessions = len(series.sessions)
+            # Copies, so the vectorised work below runs without holding the lock.
+            seconds = series.seconds[: series.size].copy()
+            wpm = series.wpm[: series.size].copy()
+            reliable = series.reliable[: series.size].copy()
+
+        result = {
+            "company_id": company_id,
+            "job_id": job_id,
+            "sessions": sessions,
+            "answers": int(seconds.size),
+            "reliable_rate": float(reliable.mean()) if reliable.size else 0.0,
+            "answer_seconds": _distribution(seconds, percentiles, bins),
+            "words_per_min": _distribution(wpm[wpm > 0], percentiles, bins),
+        }
+        with self._lock:
+            if len(self._results) >= _MAX_CACHED_RESULTS:
+                self._results.clear()
+            self._results[result_key] = (version, result)
+        return result
+
+
+cohort_analytics = CohortAnalytics()
@@ -0,0 +1,61 @@
+﻿from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from typing import Iterable, Iterator, Optional
+
+from app.core.config import settings
+from app.core.session_store import AnswerRecord, session_store
+from app.services.feedback_generator import evaluate_single_answer
+
+_executor = ThreadPoolExecutor(max_workers=settings.eager_evaluation_workers, thread_name_prefix="answer-eval")
+
+
+def pending_evaluation_item(record: AnswerRecord, question_text: str) -> Optional[dict]:
+    """The LLM work still missing for an answer, or None if it is complete."""
+    if record.transcript and not record.feedback and record.quality.reliable:
+        return {
+            "question_id": record.question_id,
+            "question": question_text,
+            "answer": record.transcript,
+            "mode": "feedback",
+        }
+    if not record.model_answer:
+        return {
+            "question_id": record.question_id,
+            "question": question_text,
+            "answer": None,
+            "mode": "model_answer",
+        }
+    return None
+
+
+def schedule_answer_evaluation(session_id: str, question_id: str) -> Optional[Future]:
+    """Start evaluating a freshly recorded answer while the candidate moves on."""
+    if not settings.eager_evaluation or not settings.openai_api_key:
+        return None
+    session = session_store.get_session(session_id)
+    if not session:
+        return None
+    record = session.answers.get(question_id)
+    if not record:
+        return None
+    question_text = session.question_text(question_id) or ""
+    item = pending_evaluation_item(record, question_text)
+    if not item:
+        return None
+
+    def run() -> None:
+        result = evaluate_single_answer(session.company_id, session.job_id, item)
+        # A re-recorded answer replaces the record; results for the old one are dropped.
+        session_store.save_evaluation(session_id, record, result)
+
+    record.evaluation = _executor.submit(run)
+    return record.evaluation
+
+
+def iter_finished_evaluations(records: Iterable[AnswerRecord], timeout: Optional[float] = None) -> Iterator[AnswerRecord]:
+    """Yield records with an in-flight eager evaluation as each one finishes, until the timeout."""
+    futures = {r.evaluation: r for r in records if r.evaluation is not None and not r.evaluation.done()}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            yield futures[future]
+    except FuturesTimeoutError:
+        return
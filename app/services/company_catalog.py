@@ -0,0 +1,92 @@
+﻿from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+import json
+import threading
+
+_DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "companies.json"
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _iter_companies(data: Any):
+    # companies.json may hold a single company object, a list of companies,
+    # or an object with a "companies" list.
+    if isinstance(data, list):
+        items = data
+    elif isinstance(data, dict) and isinstance(data.get("companies"), list):
+        items = data["companies"]
+    elif isinstance(data, dict):
+        items = [data]
+    else:
+        items = []
+    for item in items:
+        if isinstance(item, dict) and item.get("company_id"):
+            yield item
+
+
+class CompanyCatalog:
+    """In-memory index over companies.json, reloaded when the file's mtime changes."""
+
+    def __init__(self, path: Path = _DATA_PATH) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._companies: Dict[str, Mapping[str, Any]] = {}
+        self._jobs: Dict[Tuple[str, str], Mapping[str, Any]] = {}
+        self.version = 0
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return self._path.stat().st_mtime
+        except OSError:
+            return None
+
+    def _refresh(self) -> None:
+        mtime = self._current_mtime()
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            companies: Dict[str, Mapping[str, Any]] = {}
+            jobs: Dict[Tuple[str, str], Mapping[str, Any]] = {}
+            if mtime is not None:
+                try:
+                    data = json.loads(self._path.read_text(encoding="utf-8-sig"))
+                except Exception:
+                    # Keep serving the previous index if the file is mid-write or broken.
+                    return
+                for raw in _iter_companies(data):
+                    company = _freeze(raw)
+                    companies[company["company_id"]] = company
+                    for job in company.get("jobs", ()):
+                        if job.get("job_id"):
+                            jobs[(company["company_id"], job["job_id"])] = job
+            self._companies = companies
+            self._jobs = jobs
+            self._mtime = mtime
+            self.version += 1
+
+    def get_company(self, company_id: str) -> Mapping[str, Any]:
+        self._refresh()
+        return self._companies.get(company_id, _EMPTY)
+
+    def get_job(self, company_id: str, job_id: str) -> Mapping[str, Any]:
+        self._refresh()
+        return self._jobs.get((company_id, job_id), _EMPTY)
+
+    def companies(self) -> Tuple[Mapping[str, Any], ...]:
+        self._refresh()
+        return tuple(self._companies.values())
+
+
+company_catalog = CompanyCatalog()
@@ -1,19 +1,15 @@
-﻿from pathlib import Path
-import json
+﻿from typing import Any, Mapping
 
-_DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "companies.json"
+from app.services.company_catalog import company_catalog
 
 
-def load_company(company_id: str) -> dict:
-    if not _DATA_PATH.exists():
-        return {}
-    data = json.loads(_DATA_PATH.read_text(encoding="utf-8-sig"))
-    if data.get("company_id") == company_id:
-        return data
-    return {}
+def load_company(company_id: str) -> Mapping[str, Any]:
+    return company_catalog.get_company(company_id)
 
 
-def find_job(company: dict, job_id: str) -> dict:
+def find_job(company: Mapping[str, Any], job_id: str) -> Mapping[str, Any]:
+    if company.get("company_id"):
+        return company_catalog.get_job(company["company_id"], job_id)
     for item in company.get("jobs", []):
         if item.get("job_id") == job_id:
             return item
@@ -1,14 +1,21 @@
 import json
 import logging
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from app.core.config import settings
+from app.core.llm_cache import cached_completion
+from app.core.openai_client import get_openai_client
 from app.core.session_store import AnswerRecord
-from app.services.company_data import load_company
+from app.services.model_answer_store import model_answer_store
+from app.services.prompt_builder import prompt_builder, prompt_metrics
 
 logger = logging.getLogger(__name__)
 
+_executor = ThreadPoolExecutor(max_workers=settings.report_max_workers, thread_name_prefix="report-eval")
+
 def _safe_json_loads(text: str) -> dict:
     try:
         return json.loads(text)
@@ -19,82 +26,8 @@ def _safe_json_loads(text: str) -> dict:
         logger.error(f"An unexpected error occured during JSON parsing: {e}")
         return {}
 
-def generate_question_feedback(
-    company_id: str,
-    job_id: str,
-    question_text: str,
-    transcript: str,
-) -> dict:
-    from openai import OpenAI
-
-    company = load_company(company_id)
-    job = None
-    for item in company.get("jobs", []):
-        if item.get("job_id") == job_id:
-            job = item
-            break
-
-    prompt = {
-        "company": {
-            "name": company.get("name"),
-            "summary": company.get("company_summary"),
-            "talent_profile": company.get("talent_profile"),
-            "culture_fit": company.get("culture_fit"),
-        },
-        "job": {
-            "id": job_id,
-            "title": job.get("title") if job else None,
-            "focus_points": job.get("focus_points", []) if job else [],
-        },
-        "question": question_text,
-        "answer": transcript,
-        "constraints": {
-            "language": "ko",
-            "output_format": "JSON",
-            "schema": {
-                "model_answer": "string",
-                "feedback": "string (one sentence: good + improve)",
-            },
-        },
-    }
-
-    system_text = (
-        "당신은 면접 코치입니다. "
-        "후보자의 답변을 평가하고 개선점을 제시합니다. "
-        "먼저 해당 질문에 대한 모범 답변(3~5문장)을 작성하세요. "
-        "그 다음 답변 품질을 아래 5개 축으로 판단해 가장 약한 축을 한 가지 선택하고, "
-        "피드백에서 그 축을 정확히 지적해야 합니다. "
-        "평가 축: 관련성(질문과의 직접 연결), 구체성(상황/행동/결과/수치), 근거(경험/사례), 구조(도입-핵심-결론), 기업/직무 맥락 반영. "
-        "피드백은 반드시 한 문장으로 작성하며, "
-        "형식은 '강점: ...; 개선: ...; 다음 행동: ...'를 유지하세요. "
-        "후보자의 답변이 질문과 무관하거나 의미 없는 반복/무성의한 내용이면, "
-        "피드백에서 그 사실을 명확히 지적하고 구체화를 요구해야 합니다. "
-        "모든 출력은 한국어로 작성합니다. "
-        "반환 형식은 JSON 객체이며 키는 'model_answer'와 'feedback'만 허용됩니다. "
-        "추가 텍스트, 마크다운, 코드블록 없이 JSON만 반환하세요."
-    )
-
-    user_text = (
-        "아래 컨텍스트를 참고해 질문과 답변을 평가하세요. "
-        "기업/직무 맥락을 반영한 모범 답변을 만들고, "
-        "피드백은 한 문장으로 작성하세요. "
-        "피드백에는 가장 약한 평가 축을 반드시 포함하고, "
-        "즉시 적용 가능한 다음 행동을 제시하세요. "
-        "답변이 질문과 무관하거나 내용이 빈약하면 그 사실을 피드백에 명확히 반영하세요.\n"
-        f"Context: {json.dumps(prompt, ensure_ascii=False)}"
-    )
-
-    client = OpenAI(api_key=settings.openai_api_key)
-    response = client.responses.create(
-        model=settings.openai_eval_model or settings.openai_model,
-        input=[
-            {"role": "system", "content": system_text},
-            {"role": "user", "content": user_text},
-        ],
-        temperature=0.3,
-        max_output_tokens=300,
-    )
 
+def _response_text(response) -> Optional[str]:
     text = None
     if hasattr(response, "output_text"):
         text = response.output_text
@@ -103,6 +36,105 @@ def generate_question_feedback(
             text = response.output[0].content[0].text
         except Exception:
             text = None
+    return text
+
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except Exception:
+        return False
+
+
+def _complete(task: str, system_text: str, user_text: str, max_output_tokens: int) -> Optional[str]:
+    model = settings.openai_eval_model or settings.openai_model
+
+    def create() -> Optional[str]:
+        client = get_openai_client("evaluation", max_output_tokens=max_output_tokens)
+        response = client.responses.create(
+            model=model,
+            input=[
+                {"role": "system", "content": system_text},
+                {"role": "user", "content": user_text},
+            ],
+            temperature=0.3,
+            max_output_tokens=max_output_tokens,
+        )
+        prompt_metrics.record(task, response)
+        return _response_text(response)
+
+    # Unparseable output is not cached so a retry can get a fresh answer.
+    return cached_completion(model, 0.3, system_text, user_text, create, validate=_is_json)
+
+
+_FEEDBACK_INSTRUCTIONS = (
+    "당신은 면접 코치입니다. "
+    "후보자의 답변을 평가하고 개선점을 제시합니다. "
+    "먼저 해당 질문에 대한 모범 답변(3~5문장)을 작성하세요. "
+    "그 다음 답변 품질을 아래 5개 축으로 판단해 가장 약한 축을 한 가지 선택하고, "
+    "피드백에서 그 축을 정확히 지적해야 합니다. "
+    "평가 축: 관련성(질문과의 직접 연결), 구체성(상황/행동/결과/수치), 근거(경험/사례), 구조(도입-핵심-결론), 기업/직무 맥락 반영. "
+    "피드백은 반드시 한 문장으로 작성하며, "
+    "형식은 '강점: ...; 개선: ...; 다음 행동: ...'를 유지하세요. "
+    "후보자의 답변이 질문과 무관하거나 의미 없는 반복/무성의한 내용이면, "
+    "피드백에서 그 사실을 명확히 지적하고 구체화를 요구해야 합니다. "
+    "모든 출력은 한국어로 작성합니다. "
+    "반환 형식은 JSON 객체이며 키는 'model_answer'와 'feedback'만 허용됩니다. "
+    "추가 텍스트, 마크다운, 코드블록 없이 JSON만 반환하세요.\n"
+    "Context의 질문과 답변을 아래 기업/직무 맥락을 참고해 평가하세요. "
+    "기업/직무 맥락을 반영한 모범 답변을 만들고, "
+    "피드백은 한 문장으로 작성하세요. "
+    "피드백에는 가장 약한 평가 축을 반드시 포함하고, "
+    "즉시 적용 가능한 다음 행동을 제시하세요. "
+    "답변이 질문과 무관하거나 내용이 빈약하면 그 사실을 피드백에 명확히 반영하세요."
+)
+
+_FEEDBACK_CONSTRAINTS = {
+    "language": "ko",
+    "output_format": "JSON",
+    "schema": {
+        "model_answer": "string",
+        "feedback": "string (one sentence: good + improve)",
+    },
+}
+
+_MODEL_ANSWER_INSTRUCTIONS = (
+    "당신은 면접 코치입니다. "
+    "기업/직무 맥락에 맞는 간결한 모범 답변(3~5문장)을 작성하세요. "
+    "모든 출력은 한국어로 작성합니다. "
+    "반환 형식은 JSON 객체이며 키는 'model_answer'만 허용됩니다. "
+    "추가 텍스트, 마크다운, 코드블록 없이 JSON만 반환하세요.\n"
+    "Context의 질문에 대한 모범 답변을 작성하세요. "
+    "아래 기업 문화와 직무 포인트를 반영해야 합니다. "
+    "출력은 JSON 객체만 허용됩니다."
+)
+
+_MODEL_ANSWER_CONSTRAINTS = {
+    "language": "ko",
+    "output_format": "JSON",
+    "schema": {
+        "model_answer": "string (3-5 sentences, structured and concise)",
+    },
+}
+
+
+def generate_question_feedback(
+    company_id: str,
+    job_id: str,
+    question_text: str,
+    transcript: str,
+) -> dict:
+    system_text, user_text = prompt_builder.build(
+        "question_feedback",
+        _FEEDBACK_INSTRUCTIONS,
+        company_id,
+        job_id,
+        payload={"question": question_text, "answer": transcript},
+        constraints=_FEEDBACK_CONSTRAINTS,
+    )
+
+    text = _complete("question_feedback", system_text, user_text, max_output_tokens=300)
 
     data = _safe_json_loads(text or "")
     return {
@@ -116,82 +148,31 @@ def generate_model_answer(
     job_id: str,
     question_text: str,
 ) -> str:
-    from openai import OpenAI
-
-    company = load_company(company_id)
-    job = None
-    for item in company.get("jobs", []):
-        if item.get("job_id") == job_id:
-            job = item
-            break
-
-    prompt = {
-        "company": {
-            "name": company.get("name"),
-            "summary": company.get("company_summary"),
-            "talent_profile": company.get("talent_profile"),
-            "culture_fit": company.get("culture_fit"),
-        },
-        "job": {
-            "id": job_id,
-            "title": job.get("title") if job else None,
-            "focus_points": job.get("focus_points", []) if job else [],
-        },
-        "question": question_text,
-        "constraints": {
-            "language": "ko",
-            "output_format": "JSON",
-            "schema": {
-                "model_answer": "string (3-5 sentences, structured and concise)",
-            },
-        },
-    }
-
-    system_text = (
-        "당신은 면접 코치입니다. "
-        "기업/직무 맥락에 맞는 간결한 모범 답변(3~5문장)을 작성하세요. "
-        "모든 출력은 한국어로 작성합니다. "
-        "반환 형식은 JSON 객체이며 키는 'model_answer'만 허용됩니다. "
-        "추가 텍스트, 마크다운, 코드블록 없이 JSON만 반환하세요."
-    )
+    stored = model_answer_store.get(company_id, job_id, question_text)
+    if stored:
+        return stored
 
-    user_text = (
-        "아래 질문에 대한 모범 답변을 작성하세요. "
-        "기업 문화와 직무 포인트를 반영해야 합니다. "
-        "출력은 JSON 객체만 허용됩니다.\n"
-        f"Context: {json.dumps(prompt, ensure_ascii=False)}"
+    system_text, user_text = prompt_builder.build(
+        "model_answer",
+        _MODEL_ANSWER_INSTRUCTIONS,
+        company_id,
+        job_id,
+        payload={"question": question_text},
+        constraints=_MODEL_ANSWER_CONSTRAINTS,
     )
 
-    client = OpenAI(api_key=settings.openai_api_key)
-    response = client.responses.create(
-        model=settings.openai_eval_model or settings.openai_model,
-        input=[
-            {"role": "system", "content": system_text},
-            {"role": "user", "content": user_text},
-        ],
-        temperature=0.3,
-        max_output_tokens=260,
-    )
-
-    text = None
-    if hasattr(response, "output_text"):
-        text = response.output_text
-    if not text and getattr(response, "output", None):
-        try:
-            text = response.output[0].content[0].text
-        except Exception:
-            text = None
+    text = _complete("model_answer", system_text, user_text, max_output_tokens=260)
 
     data = _safe_json_loads(text or "")
-    return data.get("model_answer") or ""
+    model_answer = data.get("model_answer") or ""
+    model_answer_store.put(company_id, job_id, question_text, model_answer)
+    return model_answer
 
 
 def generate_summary_lines(
     summary: dict,
     answers: List[AnswerRecord],
 ) -> List[str]:
-    from openai import OpenAI
-
     payload = {
         "summary": summary,
         "answers": [
@@ -203,41 +184,20 @@ def generate_summary_lines(
             }
             for a in answers
         ],
-        "constraints": {
-            "language": "ko",
-            "lines": 3,
-            "format": "JSON array of strings",
-        },
     }
 
+    # Static instructions first so the prefix is identical for every session.
     system_text = (
         "당신은 면접 코치입니다. "
         "후보자의 전체 면접 수행을 정확히 3줄로 요약하세요. "
         "각 줄은 다음을 반드시 다뤄야 합니다: 1) 전반적 강점, 2) 개선점, 3) 다음 면접을 위한 구체적 행동 팁. "
         "출력은 한국어 JSON 배열이어야 하며 문자열만 포함합니다. "
-        "추가 텍스트, 마크다운, 코드블록 없이 JSON 배열만 반환하세요."
+        "추가 텍스트, 마크다운, 코드블록 없이 JSON 배열만 반환하세요.\n"
+        'Constraints: {"format": "JSON array of strings", "language": "ko", "lines": 3}'
     )
     user_text = f"Context: {json.dumps(payload, ensure_ascii=False)}"
 
-    client = OpenAI(api_key=settings.openai_api_key)
-    response = client.responses.create(
-        model=settings.openai_eval_model or settings.openai_model,
-        input=[
-            {"role": "system", "content": system_text},
-            {"role": "user", "content": user_text},
-        ],
-        temperature=0.3,
-        max_output_tokens=200,
-    )
-
-    text = None
-    if hasattr(response, "output_text"):
-        text = response.output_text
-    if not text and getattr(response, "output", None):
-        try:
-            text = response.output[0].content[0].text
-        except Exception:
-            text = None
+    text = _complete("summary", system_text, user_text, max_output_tokens=200)
 
     try:
         data = json.loads(text or "")
@@ -247,3 +207,254 @@ def generate_summary_lines(
         pass
 
     return []
+
+
+_BATCH_INSTRUCTIONS = (
+    "당신은 면접 코치입니다. "
+    "여러 질문과 후보자 답변을 한 번에 평가합니다. "
+    "items의 각 항목마다 결과 하나를 만들고 question_id를 그대로 복사하세요. "
+    "mode가 'model_answer'이면 기업/직무 맥락에 맞는 간결한 모범 답변(3~5문장)만 작성하세요. "
+    "mode가 'feedback'이면 모범 답변(3~5문장)을 작성한 뒤, "
+    "답변 품질을 아래 5개 축으로 판단해 가장 약한 축을 한 가지 선택하고 피드백에서 그 축을 정확히 지적하세요. "
+    "평가 축: 관련성(질문과의 직접 연결), 구체성(상황/행동/결과/수치), 근거(경험/사례), 구조(도입-핵심-결론), 기업/직무 맥락 반영. "
+    "피드백은 반드시 한 문장으로 작성하며, "
+    "형식은 '강점: ...; 개선: ...; 다음 행동: ...'를 유지하세요. "
+    "후보자의 답변이 질문과 무관하거나 의미 없는 반복/무성의한 내용이면, "
+    "피드백에서 그 사실을 명확히 지적하고 구체화를 요구해야 합니다. "
+    "summary_request가 있으면 후보자의 전체 면접 수행을 정확히 3줄로 요약해 summary_lines에 넣으세요. "
+    "각 줄은 1) 전반적 강점, 2) 개선점, 3) 다음 면접을 위한 구체적 행동 팁을 다뤄야 합니다. "
+    "모든 출력은 한국어로 작성합니다. "
+    "반환 형식은 JSON 객체이며 키는 'results'와 'summary_lines'만 허용됩니다. "
+    "추가 텍스트, 마크다운, 코드블록 없이 JSON만 반환하세요."
+)
+
+_BATCH_CONSTRAINTS = {
+    "language": "ko",
+    "output_format": "JSON",
+    "schema": {
+        "results": [
+            {
+                "question_id": "string (copied from items)",
+                "model_answer": "string (3-5 sentences)",
+                "feedback": "string (one sentence: good + improve), only for mode=feedback",
+            }
+        ],
+        "summary_lines": "array of exactly 3 strings, only if summary_request is present",
+    },
+}
+
+
+def evaluate_answers_batch(
+    company_id: str,
+    job_id: str,
+    items: List[dict],
+    summary: Optional[dict] = None,
+    summary_answers: Optional[List[AnswerRecord]] = None,
+) -> Tuple[Dict[str, dict], Optional[List[str]]]:
+    """Evaluate every item and the 3-line summary in one request.
+
+    Each item is {"question_id", "question", "answer", "mode"} where mode is
+    "feedback" (model answer + feedback) or "model_answer". Only well-formed
+    entries are returned; summary lines are None if they were requested but missing.
+    """
+    payload: Dict[str, Any] = {
+        "items": [
+            {
+                "question_id": item["question_id"],
+                "mode": item["mode"],
+                "question": item["question"],
+                "answer": item.get("answer") if item["mode"] == "feedback" else None,
+            }
+            for item in items
+        ],
+    }
+    if summary is not None:
+        payload["summary_request"] = {
+            "summary": summary,
+            "answers": [
+                {
+                    "question_id": a.question_id,
+                    "answer_seconds": a.answer_seconds,
+                    "transcript": a.transcript,
+                    "words_per_min": a.words_per_min,
+                }
+                for a in summary_answers or []
+            ],
+        }
+    system_text, user_text = prompt_builder.build(
+        "batch_evaluation",
+        _BATCH_INSTRUCTIONS,
+        company_id,
+        job_id,
+        payload=payload,
+        constraints=_BATCH_CONSTRAINTS,
+    )
+
+    max_output_tokens = sum(300 if item["mode"] == "feedback" else 260 for item in items)
+    if summary is not None:
+        max_output_tokens += 200
+
+    text = _complete("batch_evaluation", system_text, user_text, max_output_tokens=max_output_tokens) or ""
+    data = _safe_json_loads(text)
+    if not data:
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end > start:
+            data = _safe_json_loads(text[start:end + 1])
+    if not isinstance(data, dict):
+        data = {}
+
+    modes = {item["question_id"]: item["mode"] for item in items}
+    results: Dict[str, dict] = {}
+    raw_results = data.get("results")
+    for entry in raw_results if isinstance(raw_results, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        qid = entry.get("question_id")
+        if qid not in modes:
+            continue
+        model_answer = entry.get("model_answer")
+        feedback = entry.get("feedback")
+        if not isinstance(model_answer, str) or not model_answer.strip():
+            continue
+        if modes[qid] == "feedback":
+            if not isinstance(feedback, str) or not feedback.strip():
+                continue
+        else:
+            feedback = None
+        results[qid] = {"model_answer": model_answer.strip(), "feedback": feedback.strip() if feedback else None}
+
+    summary_lines = None
+    raw_lines = data.get("summary_lines")
+    if summary is not None and isinstance(raw_lines, list):
+        summary_lines = [str(item).strip() for item in raw_lines if str(item).strip()] or None
+
+    return results, summary_lines
+
+
+def _iter_concurrently(
+    tasks: Dict[Tuple[str, str], Callable[[], Any]],
+    timeout: float,
+) -> Iterator[Tuple[Tuple[str, str], Any]]:
+    """Run independent LLM calls on the shared pool and yield results as they finish.
+
+    Each call is bounded by the client's evaluation timeout; `timeout` is the
+    report's single deadline for all of them, including time spent queued behind
+    other reports on the pool. When it passes, calls that have not started are
+    cancelled; calls already running cannot be interrupted, so they finish in the
+    background (their output still reaches the LLM cache) and are left out here,
+    as are calls that fail.
+    """
+    if not tasks:
+        return
+    futures = {_executor.submit(fn): key for key, fn in tasks.items()}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            pending.discard(future)
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                logger.error(f"Evaluation call {futures[future]} failed: {e}")
+    except FuturesTimeoutError:
+        logger.warning(f"{len(pending)} evaluation call(s) missed the report deadline")
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def iter_evaluations(
+    company_id: str,
+    job_id: str,
+    items: List[dict],
+    summary: Optional[dict] = None,
+    summary_answers: Optional[List[AnswerRecord]] = None,
+    batch: bool = True,
+) -> Iterator[Tuple[str, str, Any]]:
+    """Evaluate pending answers and the summary, yielding each result as soon as it is available.
+
+    Yields ("answer", question_id, result) and, at most once, ("summary", "", lines).
+    With batch=True everything goes into one request first; whatever it does not
+    return is retried with per-answer calls, which run concurrently.
+    """
+    done: set = set()
+    summary_lines: Optional[List[str]] = None
+
+    # Model answers do not depend on the candidate, so shared ones skip the LLM entirely.
+    remaining: List[dict] = []
+    for item in items:
+        stored = model_answer_store.get(company_id, job_id, item["question"]) if item["mode"] == "model_answer" else None
+        if stored:
+            done.add(item["question_id"])
+            yield "answer", item["question_id"], {"model_answer": stored, "feedback": None}
+        else:
+            remaining.append(item)
+    items = remaining
+
+    if batch and (items or summary is not None):
+        try:
+            batch_results, summary_lines = evaluate_answers_batch(company_id, job_id, items, summary, summary_answers)
+        except Exception as e:
+            logger.error(f"Batched evaluation failed: {e}")
+            batch_results = {}
+        for item in items:
+            result = batch_results.get(item["question_id"])
+            if not result:
+                continue
+            if item["mode"] == "model_answer":
+                model_answer_store.put(company_id, job_id, item["question"], result["model_answer"])
+            done.add(item["question_id"])
+            yield "answer", item["question_id"], result
+        if summary_lines is not None:
+            yield "summary", "", summary_lines
+
+    failed = [item for item in items if item["question_id"] not in done]
+    if batch and failed:
+        logger.warning(f"Batched evaluation missing {len(failed)} of {len(items)} entries; falling back")
+
+    tasks: Dict[Tuple[str, str], Callable[[], Any]] = {
+        ("answer", item["question_id"]): partial(evaluate_single_answer, company_id, job_id, item)
+        for item in failed
+    }
+    if summary_lines is None and summary is not None:
+        tasks[("summary", "")] = partial(generate_summary_lines, summary, summary_answers or [])
+
+    for (kind, key), value in _iter_concurrently(tasks, timeout=settings.report_fallback_deadline_seconds):
+        yield kind, key, value
+
+
+def evaluate_answers(
+    company_id: str,
+    job_id: str,
+    items: List[dict],
+    summary: Optional[dict] = None,
+    summary_answers: Optional[List[AnswerRecord]] = None,
+    batch: bool = True,
+) -> Tuple[Dict[str, dict], List[str]]:
+    """Collected form of iter_evaluations: (results by question_id, summary lines)."""
+    results: Dict[str, dict] = {}
+    summary_lines: List[str] = []
+    for kind, key, value in iter_evaluations(company_id, job_id, items, summary, summary_answers, batch):
+        if kind == "answer":
+            results[key] = value
+        else:
+            summary_lines = value or []
+    return results, summary_lines
+
+
+def evaluate_single_answer(company_id: str, job_id: str, item: dict) -> dict:
+    if item["mode"] == "feedback":
+        return generate_question_feedback(
+            company_id=company_id,
+            job_id=job_id,
+            question_text=item["question"],
+            transcript=item["answer"],
+        )
+    return {
+        "model_answer": generate_model_answer(
+            company_id=company_id,
+            job_id=job_id,
+            question_text=item["question"],
+        ),
+        "feedback": None,
+    }
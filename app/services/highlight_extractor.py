@@ -0,0 +1,113 @@
+﻿from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import re
+
+from app.services.company_catalog import company_catalog
+
+DEFAULT_KEYWORDS = (
+    "프로젝트",
+    "서비스",
+    "개발",
+    "개선",
+    "성과",
+    "지표",
+    "매출",
+    "사용자",
+    "트래픽",
+    "속도",
+    "성능",
+    "리팩터링",
+    "배포",
+    "테스트",
+    "운영",
+    "자동화",
+    "리딩",
+    "협업",
+    "문제",
+    "해결",
+    "기술",
+    "React",
+    "TypeScript",
+    "JavaScript",
+    "Next",
+    "Vue",
+    "Node",
+    "API",
+    "DB",
+    "SQL",
+)
+
+_SENTENCE_RE = re.compile(r"[^.\n!?]+")
+_MIN_LEN = 15
+_MAX_LEN = 160
+
+
+class HighlightExtractor:
+    """Finds resume/JD sentences that mention a number or a keyword.
+
+    All keywords are compiled into one case-insensitive alternation, so the
+    text is scanned once and each hit is mapped to its sentence by offset.
+    """
+
+    def __init__(self, keywords: Iterable[str] = DEFAULT_KEYWORDS) -> None:
+        self.keywords = tuple(dict.fromkeys(k for k in keywords if k))
+        # Longest first so overlapping keywords prefer the more specific one.
+        alternation = "|".join(re.escape(k) for k in sorted(self.keywords, key=len, reverse=True))
+        self._pattern = re.compile(rf"\d+|{alternation}" if alternation else r"\d+", re.IGNORECASE)
+
+    def score_sentences(self, text: Optional[str]) -> List[Tuple[str, int]]:
+        """Return (sentence, hit_count) for every sentence of usable length, in order."""
+        if not text:
+            return []
+        segments = [m.span() for m in _SENTENCE_RE.finditer(text)]
+        if not segments:
+            return []
+        starts = [start for start, _ in segments]
+        hits = [0] * len(segments)
+        for match in self._pattern.finditer(text):
+            pos = bisect_right(starts, match.start()) - 1
+            if pos >= 0 and match.start() < segments[pos][1]:
+                hits[pos] += 1
+
+        scored: List[Tuple[str, int]] = []
+        for (start, end), count in zip(segments, hits):
+            sentence = text[start:end].strip()
+            if _MIN_LEN <= len(sentence) <= _MAX_LEN:
+                scored.append((sentence, count))
+        return scored
+
+    def extract(self, text: Optional[str], limit: int = 6) -> List[str]:
+        """The `limit` highest-scoring sentences, in document order (ties favour earlier ones)."""
+        if not text:
+            return []
+        scored = [(i, s, score) for i, (s, score) in enumerate(self.score_sentences(text)) if score > 0]
+        if scored:
+            best = heapq.nsmallest(limit, scored, key=lambda item: (-item[2], item[0]))
+            return [s for _, s, _ in sorted(best)]
+        # fallback: take non-empty lines
+        candidates = [line.strip() for line in text.splitlines() if _MIN_LEN <= len(line.strip()) <= _MAX_LEN]
+        return candidates[:limit]
+
+
+_default_extractor = HighlightExtractor()
+_extractors: Dict[Tuple[str, str, int], HighlightExtractor] = {}
+
+
+def get_highlight_extractor(company_id: Optional[str] = None, job_id: Optional[str] = None) -> HighlightExtractor:
+    """Extractor for the default keywords plus any `highlight_keywords` on the company/job."""
+    if not company_id:
+        return _default_extractor
+    company = company_catalog.get_company(company_id)
+    job = company_catalog.get_job(company_id, job_id) if job_id else {}
+    extra = tuple(company.get("highlight_keywords", ())) + tuple(job.get("highlight_keywords", ()))
+    if not extra:
+        return _default_extractor
+    key = (company_id, job_id or "", company_catalog.version)
+    extractor = _extractors.get(key)
+    if extractor is None:
+        extractor = HighlightExtractor(DEFAULT_KEYWORDS + extra)
+        for stale in [k for k in _extractors if k[2] != key[2]]:
+            _extractors.pop(stale, None)
+        _extractors[key] = extractor
+    return extractor
@@ -0,0 +1,147 @@
+﻿from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import argparse
+import hashlib
+import sqlite3
+import threading
+import time
+
+from app.core.config import settings
+from app.services.question_similarity import normalize_question
+
+_DEFAULT_PATH = Path(__file__).resolve().parents[1] / "data" / "model_answers.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_answers (
+    key TEXT PRIMARY KEY,
+    company_id TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    model_answer TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+)
+"""
+
+
+def model_answer_key(company_id: str, job_id: str, question_text: str) -> str:
+    raw = f"{company_id}\x1f{job_id}\x1f{normalize_question(question_text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ModelAnswerStore:
+    """Model answers shared across sessions: SQLite on disk with an in-memory LRU in front."""
+
+    def __init__(self, path: Path, memory_size: int) -> None:
+        self._path = path
+        self._memory_size = memory_size
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self._path), timeout=5)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+                conn.commit()
+            except sqlite3.Error as exc:
+                print(f"[model_answer_store] disabled path={self._path} error={exc!r}")
+                return None
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, model_answer: str) -> None:
+        if self._memory_size <= 0:
+            return
+        with self._lock:
+            self._memory[key] = model_answer
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_size:
+                self._memory.popitem(last=False)
+
+    def get(self, company_id: str, job_id: str, question_text: str) -> Optional[str]:
+        if not question_text:
+            return None
+        key = model_answer_key(company_id, job_id, question_text)
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                return cached
+        conn = self._conn()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute("SELECT model_answer FROM model_answers WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        if not row:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def put(self, company_id: str, job_id: str, question_text: str, model_answer: Optional[str]) -> None:
+        if not question_text or not model_answer:
+            return
+        key = model_answer_key(company_id, job_id, question_text)
+        self._remember(key, model_answer)
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO model_answers (key, company_id, job_id, question, model_answer, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, company_id, job_id, question_text, model_answer, int(time.time())),
+            )
+            conn.commit()
+        except sqlite3.Error as exc:
+            print(f"[model_answer_store] write_failed error={exc!r}")
+
+
+model_answer_store = ModelAnswerStore(
+    Path(settings.model_answer_store_path) if settings.model_answer_store_path else _DEFAULT_PATH,
+    settings.model_answer_cache_size,
+)
+
+
+def warm_up() -> int:
+    """Pre-fill model answers for the template questions every session can receive."""
+    from app.services.company_catalog import company_catalog
+    from app.services.feedback_generator import generate_model_answer
+    from app.services.question_generator import template_questions
+
+    created = 0
+    for company in company_catalog.companies():
+        company_id = company["company_id"]
+        for job in company.get("jobs", ()):
+            job_id = job.get("job_id")
+            if not job_id:
+                continue
+            for question in template_questions(company_id, job_id):
+                if model_answer_store.get(company_id, job_id, question):
+                    continue
+                try:
+                    # generate_model_answer writes through to the store.
+                    if generate_model_answer(company_id, job_id, question):
+                        created += 1
+                except Exception as exc:
+                    print(f"[model_answer_store] warm_failed question={question} error={exc!r}")
+    return created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Model answer store maintenance.")
+    parser.add_argument("command", choices=["warm"])
+    parser.parse_args()
+    if not settings.openai_api_key:
+        raise SystemExit("OPENAI_API_KEY is required to generate model answers")
+    print(f"[model_answer_store] warmed {warm_up()} model answers")
+
+
+if __name__ == "__main__":
+    main()
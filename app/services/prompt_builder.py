@@ -0,0 +1,129 @@
+﻿from typing import Any, Dict, Optional, Tuple
+import json
+import threading
+
+from app.services.company_catalog import company_catalog
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+class PromptBuilder:
+    """Builds prompts as a static per-task/company/job prefix followed by the per-call payload.
+
+    The prefix (instructions, constraints and company context) is rendered once
+    per catalog version and reused byte-for-byte, so provider-side prefix caching
+    can hit across sessions. Only the user message varies between calls.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version = -1
+        self._prefixes: Dict[Tuple[str, str, str], str] = {}
+
+    def company_context(self, company_id: str, job_id: str) -> dict:
+        company = company_catalog.get_company(company_id)
+        job = company_catalog.get_job(company_id, job_id)
+        return {
+            "company": {
+                "name": company.get("name"),
+                "summary": company.get("company_summary"),
+                "talent_profile": company.get("talent_profile"),
+                "culture_fit": company.get("culture_fit"),
+            },
+            "job": {
+                "id": job_id,
+                "title": job.get("title") if job else None,
+                "focus_points": job.get("focus_points", []) if job else [],
+            },
+        }
+
+    def prefix(
+        self,
+        task: str,
+        instructions: str,
+        company_id: str,
+        job_id: str,
+        constraints: Optional[dict] = None,
+    ) -> str:
+        # get_company refreshes the catalog, so the version below is current.
+        company_catalog.get_company(company_id)
+        key = (task, company_id, job_id)
+        with self._lock:
+            if self._version != company_catalog.version:
+                self._prefixes.clear()
+                self._version = company_catalog.version
+            cached = self._prefixes.get(key)
+        if cached is not None:
+            return cached
+
+        parts = [instructions]
+        if constraints:
+            parts.append(f"Constraints: {_dumps(constraints)}")
+        parts.append(f"Company context: {_dumps(self.company_context(company_id, job_id))}")
+        text = "\n".join(parts)
+        with self._lock:
+            self._prefixes[key] = text
+        return text
+
+    def build(
+        self,
+        task: str,
+        instructions: str,
+        company_id: str,
+        job_id: str,
+        payload: dict,
+        constraints: Optional[dict] = None,
+    ) -> Tuple[str, str]:
+        """Return (system_text, user_text) with every variable field in the user text."""
+        system_text = self.prefix(task, instructions, company_id, job_id, constraints)
+        return system_text, f"Context: {_dumps(payload)}"
+
+
+class PromptMetrics:
+    """Input-token and cached-token counters per prompt task.
+
+    Streams closed early report no usage; they are counted in `cutoff_streams`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tasks: Dict[str, Dict[str, int]] = {}
+
+    def _task(self, task: str) -> Dict[str, int]:
+        return self._tasks.setdefault(
+            task, {"requests": 0, "input_tokens": 0, "cached_tokens": 0, "cutoff_streams": 0}
+        )
+
+    def record(self, task: str, response: Any) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        details = getattr(usage, "input_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        with self._lock:
+            stats = self._task(task)
+            stats["requests"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["cached_tokens"] += cached_tokens
+
+    def record_cutoff(self, task: str) -> None:
+        """Count a stream closed before its usage arrived; its tokens are not in the totals."""
+        with self._lock:
+            self._task(task)["cutoff_streams"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                task: {
+                    **values,
+                    "cached_ratio": (values["cached_tokens"] / values["input_tokens"]) if values["input_tokens"] else 0.0,
+                }
+                for task, values in self._tasks.items()
+            }
+
+
+prompt_builder = PromptBuilder()
+prompt_metrics = PromptMetrics()
@@ -0,0 +1,138 @@
+﻿from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import threading
+import time
+
+from app.core.config import settings
+
+_DEFAULT_PATH = Path(__file__).resolve().parents[1] / "data" / "question_bank.json"
+
+STYLES = ("neutral", "friendly", "pressure")
+
+
+def _bank_key(company_id: str, job_id: str, style: Optional[str]) -> str:
+    return f"{company_id}/{job_id}/{style or 'neutral'}"
+
+
+class QuestionBank:
+    """Pre-generated generic questions per (company_id, job_id, style), reloaded when the file changes."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._entries: Dict[str, Tuple[str, ...]] = {}
+
+    @property
+    def path(self) -> Path:
+        """The bank file: question_bank_path if configured, else app/data/question_bank.json."""
+        return self._path
+
+    def _refresh(self) -> None:
+        try:
+            mtime = self._path.stat().st_mtime
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            entries: Dict[str, Tuple[str, ...]] = {}
+            if mtime is not None:
+                try:
+                    data = json.loads(self._path.read_text(encoding="utf-8"))
+                    entries = {k: tuple(v) for k, v in data.get("entries", {}).items()}
+                except Exception:
+                    return
+            self._entries = entries
+            self._mtime = mtime
+
+    def get(self, company_id: str, job_id: str, style: Optional[str]) -> Tuple[str, ...]:
+        self._refresh()
+        return self._entries.get(_bank_key(company_id, job_id, style), ())
+
+
+question_bank = QuestionBank(Path(settings.question_bank_path) if settings.question_bank_path else _DEFAULT_PATH)
+
+
+def build_question_bank(pool_size: int = 30, use_llm: bool = True) -> Dict[str, List[str]]:
+    # Imported here: question_generator reads the bank at request time.
+    from app.services.company_catalog import company_catalog
+    from app.services import question_generator as qg
+
+    entries: Dict[str, List[str]] = {}
+    for company in company_catalog.companies():
+        company_id = company["company_id"]
+        for job in company.get("jobs", ()):
+            job_id = job.get("job_id")
+            if not job_id:
+                continue
+            for style in STYLES:
+                style_arg = None if style == "neutral" else style
+                questions: List[str] = []
+                if use_llm and settings.openai_api_key:
+                    try:
+                        system_text, user_text = qg._build_llm_prompt(
+                            company_id=company_id,
+                            job_id=job_id,
+                            resume_text=None,
+                            self_intro_text=None,
+                            jd_text=None,
+                            count=pool_size,
+                            style=style_arg,
+                        )
+                        questions = qg._request_llm_questions(
+                            system_text,
+                            user_text,
+                            style_arg,
+                            max_output_tokens=max(settings.openai_max_output_tokens, pool_size * 80),
+                        )
+                    except Exception as exc:
+                        print(f"[question_bank] llm_failed key={_bank_key(company_id, job_id, style)} error={exc!r}")
+                if not questions:
+                    questions = [
+                        q["text"]
+                        for q in qg._generate_questions_rule_based(
+                            company_id=company_id,
+                            job_id=job_id,
+                            resume_text=None,
+                            self_intro_text=None,
+                            jd_text=None,
+                            count=pool_size,
+                            style=style_arg,
+                        )
+                    ]
+                questions = qg._dedupe_similar(qg._sanitize_tone(questions, style_arg))
+                # The self-introduction is fixed per style and never drawn from the bank.
+                questions = [q for q in questions if not qg._is_self_intro(q)]
+                entries[_bank_key(company_id, job_id, style)] = questions
+                print(f"[question_bank] key={_bank_key(company_id, job_id, style)} count={len(questions)}")
+    return entries
+
+
+def write_question_bank(entries: Dict[str, List[str]], path: Path) -> None:
+    payload = {"version": 1, "generated_at": int(time.time()), "entries": entries}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-generate the interview question bank.")
+    parser.add_argument("--pool-size", type=int, default=30)
+    parser.add_argument("--out", type=Path, default=question_bank.path)
+    parser.add_argument("--no-llm", action="store_true", help="use rule-based templates only")
+    args = parser.parse_args()
+
+    entries = build_question_bank(pool_size=args.pool_size, use_llm=not args.no_llm)
+    write_question_bank(entries, args.out)
+    print(f"[question_bank] wrote {sum(len(v) for v in entries.values())} questions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
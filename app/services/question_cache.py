@@ -0,0 +1,53 @@
+﻿from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+import hashlib
+import json
+import threading
+import time
+
+from app.core.config import settings
+
+
+def question_set_key(**inputs) -> str:
+    raw = json.dumps(inputs, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QuestionSetCache:
+    """LRU cache of generated question texts with a per-entry TTL."""
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, Tuple[float, Tuple[str, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, ...]]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, texts = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return texts
+
+    def put(self, key: str, texts: Sequence[str]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, tuple(texts))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+question_set_cache = QuestionSetCache(settings.question_cache_size, settings.question_cache_ttl_seconds)
@@ -1,30 +1,62 @@
 ﻿import json
+import random
 import uuid
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 
 from app.core.config import settings
-from app.services.company_data import load_company
+from app.core.llm_cache import cached_completion
+from app.core.openai_client import get_openai_client
+from app.core.session_store import session_store
+from app.services.company_catalog import company_catalog
+from app.services.company_data import load_company, find_job
+from app.services.highlight_extractor import get_highlight_extractor
+from app.services.prompt_builder import prompt_builder, prompt_metrics
+from app.services.question_bank import question_bank
+from app.services.question_cache import question_set_cache, question_set_key
+from app.services.question_similarity import QuestionIndex
 
-_DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "companies.json"
 _LOG_DIR = Path(__file__).resolve().parents[1] / "logs"
 _LOG_FILE = _LOG_DIR / "questions.log"
 
+_FALLBACK_QUESTIONS = [
+    "팀에서 의견 충돌이 있었을 때 어떻게 조율했나요?",
+    "최근 개선한 기능이나 프로세스를 설명해 주세요.",
+    "가장 큰 실수에서 무엇을 배웠나요?",
+    "업무 우선순위를 어떻게 정하나요?",
+]
 
-def _load_company(company_id: str) -> dict:
-    if not _DATA_PATH.exists():
-        return {}
-    data = json.loads(_DATA_PATH.read_text(encoding="utf-8"))
-    if data.get("company_id") == company_id:
-        return data
-    return {}
+_background_executor = ThreadPoolExecutor(
+    max_workers=settings.question_background_workers,
+    thread_name_prefix="question-gen",
+)
 
 
 def _next_id() -> str:
     return uuid.uuid4().hex
 
 
+def _to_question_items(texts: List[str]) -> List[dict]:
+    return [
+        {
+            "question_id": _next_id(),
+            "text": text,
+            "time_limit_seconds": settings.time_limit_seconds,
+        }
+        for text in texts
+    ]
+
+
+def _self_intro_question(style: Optional[str]) -> str:
+    if style == "pressure":
+        return "자기소개를 1분 내로 핵심만 말해 주세요."
+    if style == "friendly":
+        return "편하게 자기소개 부탁드립니다."
+    return "간단히 자기소개 해주세요."
+
+
 def _clip(text: Optional[str], limit: int = 2000) -> Optional[str]:
     if not text:
         return text
@@ -68,6 +100,65 @@ def _parse_questions(text: str) -> List[str]:
     return parsed
 
 
+class _JsonArrayStreamParser:
+    """Incrementally reads the first JSON array of strings, returning each string once it closes."""
+
+    def __init__(self) -> None:
+        self._state = "before"
+        self._buf: List[str] = []
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[str]:
+        items: List[str] = []
+        for ch in chunk:
+            if self._state == "string":
+                self._buf.append(ch)
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    try:
+                        items.append(str(json.loads("".join(self._buf))).strip())
+                    except Exception:
+                        pass
+                    self._buf = []
+                    self._state = "array"
+            elif self._state == "array":
+                if ch == '"':
+                    self._buf = [ch]
+                    self._state = "string"
+                elif ch == "]":
+                    self._state = "done"
+            elif self._state == "before" and ch == "[":
+                self._state = "array"
+        return items
+
+
+class _QuestionCollector:
+    """Applies _dedupe_similar + _remove_duplicate_self_intro to streamed strings as they close."""
+
+    def __init__(self, target_count: int) -> None:
+        self.target_count = target_count
+        self.questions: List[str] = []
+        self._parser = _JsonArrayStreamParser()
+        self._index = QuestionIndex(0.8)
+        self._self_intro_kept = False
+
+    def feed(self, chunk: str) -> bool:
+        for q in self._parser.feed(chunk):
+            if len(self.questions) >= self.target_count:
+                break
+            if not q or not self._index.add_if_unique(q):
+                continue
+            if _is_self_intro(q):
+                if self._self_intro_kept:
+                    continue
+                self._self_intro_kept = True
+            self.questions.append(q)
+        return len(self.questions) >= self.target_count
+
+
 def _log_text(label: str, text: Optional[str]) -> None:
     if not text:
         return
@@ -89,32 +180,17 @@ def _log_list(label: str, items: List[str]) -> None:
     _log_text(label, payload)
 
 
-def _normalize_question(text: str) -> str:
-    text = text.lower()
-    text = re.sub(r"[^\w\s]", "", text)
-    text = re.sub(r"\s+", "", text)
-    return text
-
-
-def _is_similar(a: str, b: str, threshold: float = 0.85) -> bool:
-    from difflib import SequenceMatcher
-
-    na = _normalize_question(a)
-    nb = _normalize_question(b)
-    if not na or not nb:
-        return False
-    return SequenceMatcher(None, na, nb).ratio() >= threshold
-
-
 def _dedupe_similar(questions: List[str], threshold: float = 0.8) -> List[str]:
-    result: List[str] = []
+    index = QuestionIndex(threshold)
     for q in questions:
         if not q or not q.strip():
             continue
-        if any(_is_similar(q, exist, threshold) for exist in result):
-            continue
-        result.append(q)
-    return result
+        index.add_if_unique(q)
+    return index.texts()
+
+
+def _is_self_intro(text: str) -> bool:
+    return "자기소개" in text or "본인" in text and "소개" in text
 
 
 def _remove_duplicate_self_intro(questions: List[str]) -> List[str]:
@@ -123,8 +199,7 @@ def _remove_duplicate_self_intro(questions: List[str]) -> List[str]:
     result: List[str] = []
     first_kept = False
     for q in questions:
-        is_self_intro = "자기소개" in q or "본인" in q and "소개" in q
-        if is_self_intro:
+        if _is_self_intro(q):
             if not first_kept:
                 result.append(q)
                 first_kept = True
@@ -140,6 +215,14 @@ def _is_company_fit_question(text: str, company_name: str) -> bool:
     return any(k in text for k in keywords)
 
 
+def _company_fit_question(company_name: str, style: Optional[str]) -> str:
+    if style == "pressure":
+        return f"{company_name}의 인재상과 문화에 비춰봤을 때 본인의 강점을 근거와 함께 말해 주세요."
+    if style == "friendly":
+        return f"{company_name}의 인재상과 문화에서 본인이 어떤 기여를 할 수 있을지 편하게 말씀해 주세요."
+    return f"{company_name}의 인재상과 문화와 연결해 본인의 강점을 설명해 주세요."
+
+
 def _ensure_company_last(questions: List[str], company_name: str, style: Optional[str]) -> List[str]:
     if not questions:
         return questions
@@ -147,75 +230,28 @@ def _ensure_company_last(questions: List[str], company_name: str, style: Optiona
     if _is_company_fit_question(last, company_name):
         return questions
 
-    if style == "pressure":
-        last_q = f"{company_name}의 인재상과 문화에 비춰봤을 때 본인의 강점을 근거와 함께 말해 주세요."
-    elif style == "friendly":
-        last_q = f"{company_name}의 인재상과 문화에서 본인이 어떤 기여를 할 수 있을지 편하게 말씀해 주세요."
-    else:
-        last_q = f"{company_name}의 인재상과 문화와 연결해 본인의 강점을 설명해 주세요."
+    last_q = _company_fit_question(company_name, style)
 
-    if any(_is_similar(last_q, q) for q in questions):
+    if QuestionIndex(0.85, questions).contains_similar(last_q):
         return questions
 
     return questions[:-1] + [last_q]
 
 
 def _append_unique(base: List[str], candidates: List[str], threshold: float = 0.85) -> List[str]:
-    result = base[:]
+    index = QuestionIndex(threshold, base)
     for c in candidates:
-        if any(_is_similar(c, exist, threshold) for exist in result):
-            continue
-        result.append(c)
-    return result
+        index.add_if_unique(c)
+    return index.texts()
 
 
-def _extract_highlights(text: Optional[str], limit: int = 6) -> List[str]:
-    if not text:
-        return []
-    keywords = [
-        "프로젝트",
-        "서비스",
-        "개발",
-        "개선",
-        "성과",
-        "지표",
-        "매출",
-        "사용자",
-        "트래픽",
-        "속도",
-        "성능",
-        "리팩터링",
-        "배포",
-        "테스트",
-        "운영",
-        "자동화",
-        "리딩",
-        "협업",
-        "문제",
-        "해결",
-        "기술",
-        "React",
-        "TypeScript",
-        "JavaScript",
-        "Next",
-        "Vue",
-        "Node",
-        "API",
-        "DB",
-        "SQL",
-    ]
-    sentences = re.split(r"[.\n!?]+", text)
-    candidates: List[str] = []
-    for raw in sentences:
-        s = raw.strip()
-        if len(s) < 15 or len(s) > 160:
-            continue
-        if any(ch.isdigit() for ch in s) or any(k.lower() in s.lower() for k in keywords):
-            candidates.append(s)
-    # fallback: take non-empty lines
-    if not candidates:
-        candidates = [line.strip() for line in text.splitlines() if 15 <= len(line.strip()) <= 160]
-    return candidates[:limit]
+def _extract_highlights(
+    text: Optional[str],
+    limit: int = 6,
+    company_id: Optional[str] = None,
+    job_id: Optional[str] = None,
+) -> List[str]:
+    return get_highlight_extractor(company_id, job_id).extract(text, limit)
 
 
 def _sanitize_tone(questions: List[str], style: Optional[str]) -> List[str]:
@@ -249,11 +285,7 @@ def _generate_questions_rule_based(
     style: Optional[str],
 ) -> List[dict]:
     company = load_company(company_id)
-    job = None
-    for item in company.get("jobs", []):
-        if item.get("job_id") == job_id:
-            job = item
-            break
+    job = find_job(company, job_id)
 
     questions: List[str] = []
 
@@ -261,12 +293,7 @@ def _generate_questions_rule_based(
     job_title = job.get("title", "직무") if job else "직무"
 
     # Q1 is always a self-introduction
-    if style == "pressure":
-        questions.append("자기소개를 1분 내로 핵심만 말해 주세요.")
-    elif style == "friendly":
-        questions.append("편하게 자기소개 부탁드립니다.")
-    else:
-        questions.append("간단히 자기소개 해주세요.")
+    questions.append(_self_intro_question(style))
 
     if style == "pressure":
         questions.append(f"{company_name} {job_title}에 지원한 이유를 핵심만 말해 주세요.")
@@ -276,7 +303,11 @@ def _generate_questions_rule_based(
         questions.append(f"{company_name} {job_title}에 지원한 이유를 말씀해 주세요.")
 
     if resume_text or self_intro_text:
-        highlights = _extract_highlights(f"{resume_text or ''}\n{self_intro_text or ''}")
+        highlights = _extract_highlights(
+            f"{resume_text or ''}\n{self_intro_text or ''}",
+            company_id=company_id,
+            job_id=job_id,
+        )
         for h in highlights[:2]:
             snippet = h[:60]
             if style == "pressure":
@@ -294,7 +325,7 @@ def _generate_questions_rule_based(
             questions.append("이력서/자소서에서 가장 강점을 보여주는 경험 하나를 설명해 주세요.")
 
     if jd_text:
-        jd_highlights = _extract_highlights(jd_text, limit=3)
+        jd_highlights = _extract_highlights(jd_text, limit=3, company_id=company_id, job_id=job_id)
         for h in jd_highlights[:1]:
             snippet = h[:60]
             if style == "pressure":
@@ -313,8 +344,7 @@ def _generate_questions_rule_based(
 
     focus_points = job.get("focus_points", []) if job else []
     if focus_points:
-        focus_points = focus_points[:]
-        import random
+        focus_points = list(focus_points)
         random.shuffle(focus_points)
     for point in focus_points:
         if style == "pressure":
@@ -340,31 +370,76 @@ def _generate_questions_rule_based(
     questions = _remove_duplicate_self_intro(questions)
 
     if len(questions) < count:
-        fallback = [
-            "팀에서 의견 충돌이 있었을 때 어떻게 조율했나요?",
-            "최근 개선한 기능이나 프로세스를 설명해 주세요.",
-            "가장 큰 실수에서 무엇을 배웠나요?",
-            "업무 우선순위를 어떻게 정하나요?",
-        ]
-        questions = _append_unique(questions, fallback)
+        questions = _append_unique(questions, _FALLBACK_QUESTIONS)
 
     questions = questions[:count]
     questions = _sanitize_tone(questions, style)
     questions = _ensure_company_last(questions, company_name, style)
 
-    result = [
-        {
-            "question_id": _next_id(),
-            "text": text,
-            "time_limit_seconds": settings.time_limit_seconds,
-        }
-        for text in questions
-    ]
+    result = _to_question_items(questions)
     print("[question_generator] questions=", [q["text"] for q in result])
     return result
 
 
-def _generate_questions_llm(
+_QUESTION_INSTRUCTIONS = (
+    "당신은 면접 질문을 생성하는 코치입니다. "
+    "목표는 '지원자의 자소서/이력서에서 궁금한 점을 파고드는 질문'을 만드는 것입니다. "
+    "회사/직무/인재상/컬처핏/직무 포인트를 반영하세요. "
+    "interview_style에 맞게 문장 톤을 조정하세요 (friendly/pressure/neutral). "
+    "pressure 스타일일 때는 친절한 표현(편하게, 부담 없이, 자유롭게 등)을 사용하지 마세요. "
+    "모든 질문은 1~2문장, 100자 이내로 작성하세요. "
+    "민감/차별 가능 주제(정치, 종교, 가족/출신, 건강/질병, 나이/성별, 혼인/임신, 국적/인종)는 제외하세요. "
+    "candidate_highlights 또는 resume_text/self_intro_text가 있으면 반드시 그 내용에서 2개 이상 개인화 질문을 만드세요. "
+    "질문은 일반적인 표현을 피하고, 지원서의 구체적 내용(프로젝트명, 역할, 수치, 기술)을 직접 언급하세요. "
+    "질문은 서로 중복되거나 유사하지 않도록 하세요. "
+    "출력은 반드시 JSON 문자열 배열만 반환하세요. "
+)
+_QUESTION_TASK_GUIDE = (
+    "사용자 메시지의 컨텍스트를 바탕으로 질문을 생성하세요. "
+    "지원자의 자소서/이력서에서 구체적 성과, 역할, 선택 이유, 문제 해결 방식에 대해 깊게 묻는 질문을 포함하세요. "
+    "회사 인재상/컬처핏/직무 포인트와 연결되는 질문을 포함하세요. "
+    "중복은 피하세요."
+)
+_QUESTION_STYLE_GUIDANCE = {
+    "pressure": [
+        "Use a direct and strict tone. Do not use friendly phrases like '편하게', '부담 없이', '자유롭게'.",
+        "Include at least one question asking for evidence or metrics.",
+        "Include at least one question probing risks or trade-offs."
+    ]
+}
+_QUESTION_CONSTRAINTS = {
+    "language": "ko",
+    "first_question_fixed": "자기소개 질문(스타일에 맞게 말투만 변경 가능)",
+    "output_format": "JSON array of strings",
+    "max_sentence": 2,
+    "max_characters": 100,
+    "forbidden_topics": [
+        "정치",
+        "종교",
+        "가족/출신",
+        "건강/질병",
+        "나이/성별",
+        "혼인/임신",
+        "국적/인종"
+    ],
+    "style_guidance": _QUESTION_STYLE_GUIDANCE,
+    "quality_rules": [
+        "Avoid repeating similar questions.",
+        "Use resume/self_intro content to create at least two personalized questions.",
+        "If resume/self_intro is empty, skip personalization."
+    ],
+}
+_PERSONALIZED_CONSTRAINTS = {
+    **{k: v for k, v in _QUESTION_CONSTRAINTS.items() if k != "first_question_fixed"},
+    "quality_rules": [
+        "Avoid repeating similar questions.",
+        "Every question must be personalized from resume/self_intro/job_description content.",
+        "Do not include a self-introduction question or generic questions."
+    ],
+}
+
+
+def _build_llm_prompt(
     company_id: str,
     job_id: str,
     resume_text: Optional[str],
@@ -372,152 +447,215 @@ def _generate_questions_llm(
     jd_text: Optional[str],
     count: int,
     style: Optional[str],
-) -> List[dict]:
-    from openai import OpenAI
-
-    company = load_company(company_id)
-    job = None
-    for item in company.get("jobs", []):
-        if item.get("job_id") == job_id:
-            job = item
-            break
+    personalized_only: bool = False,
+) -> Tuple[str, str]:
+    resume_highlights = _extract_highlights(
+        f"{resume_text or ''}\n{self_intro_text or ''}",
+        company_id=company_id,
+        job_id=job_id,
+    )
+    jd_highlights = _extract_highlights(jd_text, limit=3, company_id=company_id, job_id=job_id)
+
+    # Instructions, rules and company context form a static prefix shared by every
+    # session for this company/job; only the candidate payload below varies.
+    if personalized_only:
+        task = "questions_personalized"
+        instructions = _QUESTION_INSTRUCTIONS + "자기소개나 일반 질문 없이 지원서 기반 개인화 질문만 작성하세요.\n"
+        constraints = _PERSONALIZED_CONSTRAINTS
+    else:
+        task = "questions"
+        instructions = _QUESTION_INSTRUCTIONS + "첫 질문은 반드시 자기소개 질문이어야 하며, 스타일 톤을 반영하세요.\n"
+        constraints = _QUESTION_CONSTRAINTS
 
-    company_name = company.get("name", "회사")
-    job_title = job.get("title", "직무") if job else "직무"
-    focus_points = job.get("focus_points", []) if job else []
-    resume_highlights = _extract_highlights(f"{resume_text or ''}\n{self_intro_text or ''}")
-    jd_highlights = _extract_highlights(jd_text, limit=3)
-
-    prompt = {
-        "company": {
-            "name": company_name,
-            "summary": company.get("company_summary"),
-            "talent_profile": company.get("talent_profile"),
-            "culture_fit": company.get("culture_fit"),
-        },
-        "job": {
-            "id": job_id,
-            "title": job_title,
-            "focus_points": focus_points,
-        },
+    payload = {
+        "question_count": count,
+        "interview_style": style or "neutral",
         "candidate_highlights": resume_highlights,
         "jd_highlights": jd_highlights,
-        "interview_style": style or "neutral",
         "candidate": {
             "resume_text": _clip(resume_text),
             "self_intro_text": _clip(self_intro_text),
         },
         "job_description": _clip(jd_text),
-        "constraints": {
-            "language": "ko",
-            "question_count": count,
-            "first_question_fixed": "자기소개 질문(스타일에 맞게 말투만 변경 가능)",
-            "output_format": "JSON array of strings",
-            "max_sentence": 2,
-            "max_characters": 100,
-            "forbidden_topics": [
-                "정치",
-                "종교",
-                "가족/출신",
-                "건강/질병",
-                "나이/성별",
-                "혼인/임신",
-                "국적/인종"
-            ],
-        },
-        "style_guidance": {
-            "pressure": [
-                "Use a direct and strict tone. Do not use friendly phrases like '편하게', '부담 없이', '자유롭게'.",
-                "Include at least one question asking for evidence or metrics.",
-                "Include at least one question probing risks or trade-offs."
-            ]
-        },
-        "quality_rules": [
-            "Avoid repeating similar questions.",
-            "Use resume/self_intro content to create at least two personalized questions.",
-            "If resume/self_intro is empty, skip personalization."
-        ],
     }
-
-    system_text = (
-        "당신은 면접 질문을 생성하는 코치입니다. "
-        "목표는 '지원자의 자소서/이력서에서 궁금한 점을 파고드는 질문'을 만드는 것입니다. "
-        "회사/직무/인재상/컬처핏/직무 포인트를 반영하세요. "
-        "interview_style에 맞게 문장 톤을 조정하세요 (friendly/pressure/neutral). "
-        "pressure 스타일일 때는 친절한 표현(편하게, 부담 없이, 자유롭게 등)을 사용하지 마세요. "
-        "모든 질문은 1~2문장, 100자 이내로 작성하세요. "
-        "민감/차별 가능 주제(정치, 종교, 가족/출신, 건강/질병, 나이/성별, 혼인/임신, 국적/인종)는 제외하세요. "
-        "candidate_highlights 또는 resume_text/self_intro_text가 있으면 반드시 그 내용에서 2개 이상 개인화 질문을 만드세요. "
-        "질문은 일반적인 표현을 피하고, 지원서의 구체적 내용(프로젝트명, 역할, 수치, 기술)을 직접 언급하세요. "
-        "질문은 서로 중복되거나 유사하지 않도록 하세요. "
-        "출력은 반드시 JSON 문자열 배열만 반환하세요. "
-        "첫 질문은 반드시 자기소개 질문이어야 하며, 스타일 톤을 반영하세요."
+    return prompt_builder.build(
+        task,
+        instructions + _QUESTION_TASK_GUIDE,
+        company_id,
+        job_id,
+        payload=payload,
+        constraints=constraints,
     )
 
-    user_text = (
-        "아래 컨텍스트를 바탕으로 질문을 생성해 주세요. "
-        "지원자의 자소서/이력서에서 구체적 성과, 역할, 선택 이유, 문제 해결 방식에 대해 깊게 묻는 질문을 포함하세요. "
-        "회사 인재상/컬처핏/직무 포인트와 연결되는 질문을 포함하세요. "
-        "중복은 피하세요.\n"
-        f"컨텍스트: {json.dumps(prompt, ensure_ascii=False)}"
-    )
 
-    client = OpenAI(api_key=settings.openai_api_key)
-    response = client.responses.create(
+def _request_llm_questions(
+    system_text: str,
+    user_text: str,
+    style: Optional[str],
+    max_output_tokens: Optional[int] = None,
+    target_count: Optional[int] = None,
+    task: str = "questions",
+) -> List[str]:
+    request = dict(
         model=settings.openai_model,
         input=[
             {"role": "system", "content": system_text},
             {"role": "user", "content": user_text},
         ],
         temperature=settings.openai_temperature,
-        max_output_tokens=settings.openai_max_output_tokens,
+        max_output_tokens=max_output_tokens or settings.openai_max_output_tokens,
     )
+    stream = bool(settings.openai_stream_questions and target_count)
+
+    def create() -> Optional[str]:
+        client = get_openai_client("questions")
+        if stream:
+            return _stream_question_text(client, request, target_count, task)
+        response = client.responses.create(**request)
+        prompt_metrics.record(task, response)
+        text = None
+        if hasattr(response, "output_text"):
+            text = response.output_text
+        if not text and getattr(response, "output", None):
+            try:
+                text = response.output[0].content[0].text
+            except Exception:
+                text = None
+        return text
 
-    text = None
-    if hasattr(response, "output_text"):
-        text = response.output_text
-    if not text and getattr(response, "output", None):
-        try:
-            text = response.output[0].content[0].text
-        except Exception:
-            text = None
+    text = cached_completion(
+        settings.openai_model,
+        settings.openai_temperature,
+        system_text,
+        user_text,
+        create,
+        validate=lambda t: bool(_JsonArrayStreamParser().feed(t)),
+    )
 
-    questions = _parse_questions(text or "")
-    questions = _dedupe_similar(questions)
-    questions = _remove_duplicate_self_intro(questions)
+    questions: List[str] = []
+    if stream:
+        # Replaying the (possibly cut-off) text gives exactly what the stream collected.
+        collector = _QuestionCollector(target_count)
+        collector.feed(text or "")
+        questions = collector.questions
+    if not questions:
+        questions = _parse_questions(text or "")
+        questions = _dedupe_similar(questions)
+        questions = _remove_duplicate_self_intro(questions)
     questions = _sanitize_tone(questions, style)
     _log_text("llm_raw", text)
     _log_list("llm_questions", questions)
+    return questions
+
+
+# Final events of a Responses stream; each carries the response with its usage.
+_FINAL_STREAM_EVENTS = ("response.completed", "response.incomplete", "response.failed")
+
+
+def _stream_question_text(client, request: dict, target_count: int, task: str = "questions") -> str:
+    collector = _QuestionCollector(target_count)
+    parts: List[str] = []
+    stream = client.responses.create(stream=True, **request)
+    try:
+        for event in stream:
+            event_type = getattr(event, "type", None)
+            if event_type in _FINAL_STREAM_EVENTS:
+                prompt_metrics.record(task, getattr(event, "response", None))
+                continue
+            if event_type != "response.output_text.delta":
+                continue
+            delta = event.delta or ""
+            parts.append(delta)
+            if collector.feed(delta):
+                _log_text("llm_stream_cutoff", f"collected={len(collector.questions)}")
+                # Usage only arrives with the final event, which a cut-off stream never sees.
+                prompt_metrics.record_cutoff(task)
+                break
+    finally:
+        try:
+            stream.close()
+        except Exception:
+            pass
+    return "".join(parts)
+
+
+def _generate_questions_llm(
+    company_id: str,
+    job_id: str,
+    resume_text: Optional[str],
+    self_intro_text: Optional[str],
+    jd_text: Optional[str],
+    count: int,
+    style: Optional[str],
+) -> List[dict]:
+    system_text, user_text = _build_llm_prompt(
+        company_id=company_id,
+        job_id=job_id,
+        resume_text=resume_text,
+        self_intro_text=self_intro_text,
+        jd_text=jd_text,
+        count=count,
+        style=style,
+    )
+    questions = _request_llm_questions(system_text, user_text, style, target_count=count)
 
     if not questions or "자기소개" not in questions[0]:
-        if style == "pressure":
-            first = "자기소개를 1분 내로 핵심만 말해 주세요."
-        elif style == "friendly":
-            first = "편하게 자기소개 부탁드립니다."
-        else:
-            first = "간단히 자기소개 해주세요."
-        questions = [first] + [q for q in questions if q]
+        questions = [_self_intro_question(style)] + [q for q in questions if q]
 
     if len(questions) < count:
-        fallback = [
-            "팀에서 의견 충돌이 있었을 때 어떻게 조율했나요?",
-            "최근 개선한 기능이나 프로세스를 설명해 주세요.",
-            "가장 큰 실수에서 무엇을 배웠나요?",
-            "업무 우선순위를 어떻게 정하나요?",
-        ]
-        questions = _append_unique(questions, fallback)
+        questions = _append_unique(questions, _FALLBACK_QUESTIONS)
 
     questions = questions[:count]
+    company_name = load_company(company_id).get("name", "회사")
     questions = _ensure_company_last(questions, company_name, style)
 
-    return [
-        {
-            "question_id": _next_id(),
-            "text": text,
-            "time_limit_seconds": settings.time_limit_seconds,
-        }
-        for text in questions
-    ]
+    return _to_question_items(questions)
+
+
+def _generate_questions_from_bank(
+    company_id: str,
+    job_id: str,
+    resume_text: Optional[str],
+    self_intro_text: Optional[str],
+    jd_text: Optional[str],
+    count: int,
+    style: Optional[str],
+    pool: Sequence[str],
+) -> List[dict]:
+    questions: List[str] = [_self_intro_question(style)]
+
+    # Only the resume/JD-specific slots need a live LLM call.
+    personal_count = min(settings.question_bank_personalized_count, count - 1)
+    if personal_count > 0 and settings.openai_api_key and (resume_text or self_intro_text or jd_text):
+        system_text, user_text = _build_llm_prompt(
+            company_id=company_id,
+            job_id=job_id,
+            resume_text=resume_text,
+            self_intro_text=self_intro_text,
+            jd_text=jd_text,
+            count=personal_count,
+            style=style,
+            personalized_only=True,
+        )
+        personalized = _request_llm_questions(
+            system_text, user_text, style, target_count=personal_count, task="questions_personalized"
+        )
+        questions.extend([q for q in personalized if not _is_self_intro(q)][:personal_count])
+
+    index = QuestionIndex(0.8, questions)
+    for q in random.sample(list(pool), len(pool)):
+        if len(questions) >= count:
+            break
+        if index.add_if_unique(q):
+            questions.append(q)
+
+    if len(questions) < count:
+        questions = _append_unique(questions, _FALLBACK_QUESTIONS)
+
+    questions = questions[:count]
+    company_name = load_company(company_id).get("name", "회사")
+    questions = _ensure_company_last(questions, company_name, style)
+    return _to_question_items(questions)
 
 
 def generate_questions(
@@ -543,19 +681,63 @@ def generate_questions(
         bool(settings.openai_api_key),
     )
 
+    # The bank is built ahead of time, so it serves deployments without an API key too.
+    pool = question_bank.get(company_id, job_id, style) if settings.question_bank_enabled else ()
     if settings.openai_api_key:
+        cache_key = question_set_key(
+            company_id=company_id,
+            job_id=job_id,
+            resume_text=resume_text,
+            self_intro_text=self_intro_text,
+            jd_text=jd_text,
+            count=count,
+            style=style,
+            model=settings.openai_model,
+            catalog_version=company_catalog.version,
+        )
+        cached = question_set_cache.get(cache_key)
+        if cached:
+            print("[question_generator] cache_hit key=", cache_key[:12])
+            return _to_question_items(list(cached))
         try:
-            return _generate_questions_llm(
-                company_id=company_id,
-                job_id=job_id,
-                resume_text=resume_text,
-                self_intro_text=self_intro_text,
-                jd_text=jd_text,
-                count=count,
-                style=style,
-            )
+            if pool:
+                questions = _generate_questions_from_bank(
+                    company_id=company_id,
+                    job_id=job_id,
+                    resume_text=resume_text,
+                    self_intro_text=self_intro_text,
+                    jd_text=jd_text,
+                    count=count,
+                    style=style,
+                    pool=pool,
+                )
+            else:
+                questions = _generate_questions_llm(
+                    company_id=company_id,
+                    job_id=job_id,
+                    resume_text=resume_text,
+                    self_intro_text=self_intro_text,
+                    jd_text=jd_text,
+                    count=count,
+                    style=style,
+                )
+            # Only LLM output is cached; a rule-based fallback after a transient
+            # failure should not be pinned for the whole TTL.
+            question_set_cache.put(cache_key, [q["text"] for q in questions])
+            return questions
         except Exception:
             pass
+    elif pool:
+        return _generate_questions_from_bank(
+            company_id=company_id,
+            job_id=job_id,
+            resume_text=resume_text,
+            self_intro_text=self_intro_text,
+            jd_text=jd_text,
+            count=count,
+            style=style,
+            pool=pool,
+        )
 
     return _generate_questions_rule_based(
         company_id=company_id,
@@ -566,3 +748,53 @@ def generate_questions(
         count=count,
         style=style,
     )
+
+
+def fixed_first_question(style: Optional[str] = None) -> dict:
+    return _to_question_items([_self_intro_question(style)])[0]
+
+
+def generate_remaining_in_background(
+    session_id: str,
+    company_id: str,
+    job_id: str,
+    resume_text: Optional[str],
+    self_intro_text: Optional[str],
+    jd_text: Optional[str],
+    count: int,
+    style: Optional[str] = None,
+) -> None:
+    # The session already holds the fixed self-introduction; everything after it
+    # is generated here and appended once ready.
+    def run() -> None:
+        remaining: List[dict] = []
+        try:
+            questions = generate_questions(
+                company_id=company_id,
+                job_id=job_id,
+                resume_text=resume_text,
+                self_intro_text=self_intro_text,
+                jd_text=jd_text,
+                count=count,
+                style=style,
+            )
+            remaining = questions[1:]
+            _log_list("background_questions", [q["text"] for q in remaining])
+        except Exception as exc:
+            _log_text("background_error", repr(exc))
+        finally:
+            session_store.append_questions(session_id, remaining)
+
+    _background_executor.submit(run)
+
+
+def template_questions(company_id: str, job_id: str) -> List[str]:
+    """Candidate-independent questions that recur across sessions for a company/job."""
+    company_name = load_company(company_id).get("name", "회사")
+    questions: List[str] = []
+    for style in (None, "friendly", "pressure"):
+        questions.append(_self_intro_question(style))
+        questions.append(_company_fit_question(company_name, style))
+        questions.extend(_FALLBACK_QUESTIONS)
+        questions.extend(question_bank.get(company_id, job_id, style))
+    return list(dict.fromkeys(questions))
@@ -0,0 +1,124 @@
+﻿from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Tuple
+import math
+import re
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    text = text.lower()
+    text = _PUNCT_RE.sub("", text)
+    text = _SPACE_RE.sub("", text)
+    return text
+
+
+def _bigrams(text: str) -> Counter:
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+class _Entry:
+    __slots__ = ("text", "norm", "chars")
+
+    def __init__(self, text: str, norm: str) -> None:
+        self.text = text
+        self.norm = norm
+        self.chars = Counter(norm)
+
+
+class QuestionIndex:
+    """Near-duplicate lookup with the same verdict as SequenceMatcher(None, a, b).ratio() >= threshold.
+
+    Questions are normalized once and indexed by bigram. The bigram filter is
+    lossless: with M matched characters there are at most len(a) + len(b) - 2M + 1
+    matching blocks, so a pair with ratio >= t shares at least
+    (1.5t - 1)(len(a) + len(b)) - 1 bigrams. Thresholds <= 2/3 make that bound
+    vacuous and fall back to a length-filtered scan.
+    """
+
+    def __init__(self, threshold: float = 0.85, questions: Iterable[str] = ()) -> None:
+        self.threshold = threshold
+        self._factor = 1.5 * threshold - 1
+        self._entries: List[_Entry] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._by_length: Dict[int, List[int]] = defaultdict(list)
+        for q in questions:
+            self.add(q)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def texts(self) -> List[str]:
+        return [e.text for e in self._entries]
+
+    def add(self, text: str) -> None:
+        norm = normalize_question(text)
+        idx = len(self._entries)
+        self._entries.append(_Entry(text, norm))
+        if not norm:
+            return
+        self._by_length[len(norm)].append(idx)
+        for gram, count in _bigrams(norm).items():
+            self._postings[gram].append((idx, count))
+
+    def add_if_unique(self, text: str) -> bool:
+        if self.contains_similar(text):
+            return False
+        self.add(text)
+        return True
+
+    def contains_similar(self, text: str) -> bool:
+        norm = normalize_question(text)
+        if not norm:
+            return False
+        chars = Counter(norm)
+        return any(self._matches(norm, chars, idx) for idx in self._candidates(norm))
+
+    def _required_shared(self, la: int, lb: int) -> int:
+        return math.ceil(self._factor * (la + lb) - 1 - 1e-9)
+
+    def _length_ok(self, la: int, lb: int) -> bool:
+        return 2 * min(la, lb) >= self.threshold * (la + lb) - 1e-9
+
+    def _candidates(self, norm: str) -> List[int]:
+        la = len(norm)
+        if self._factor <= 0:
+            return [
+                idx
+                for length, ids in self._by_length.items()
+                if self._length_ok(la, length)
+                for idx in ids
+            ]
+
+        shared: Dict[int, int] = defaultdict(int)
+        for gram, count in _bigrams(norm).items():
+            for idx, other in self._postings.get(gram, ()):
+                shared[idx] += min(count, other)
+
+        result = [
+            idx
+            for idx, hits in shared.items()
+            if self._length_ok(la, len(self._entries[idx].norm))
+            and hits >= self._required_shared(la, len(self._entries[idx].norm))
+        ]
+
+        # Very short pairs can match without sharing any bigram.
+        max_short = math.floor((1 + 1e-9) / self._factor) - la
+        for length, ids in self._by_length.items():
+            if length > max_short or not self._length_ok(la, length):
+                continue
+            result.extend(idx for idx in ids if idx not in shared)
+
+        result.sort()
+        return result
+
+    def _matches(self, norm: str, chars: Counter, idx: int) -> bool:
+        entry = self._entries[idx]
+        total = len(norm) + len(entry.norm)
+        # Character-count overlap bounds the number of matched characters.
+        overlap = sum((chars & entry.chars).values())
+        if 2 * overlap < self.threshold * total - 1e-9:
+            return False
+        return SequenceMatcher(None, norm, entry.norm).ratio() >= self.threshold
@@ -1,18 +1,67 @@
-﻿from typing import List
-import re
+﻿from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from app.schemas.report import ReportResponse, ReportSummary, AnswerTime
-from app.utils.stats import average, std_dev
-from app.services.feedback_generator import (
-    generate_model_answer,
-    generate_question_feedback,
-    generate_summary_lines,
-)
+from app.core.session_store import session_store
+from app.services.answer_evaluator import iter_finished_evaluations, pending_evaluation_item
+from app.services.feedback_generator import iter_evaluations
 from app.core.config import settings
 
 
-def build_report(session) -> ReportResponse:
-    question_text_map = {q["question_id"]: q["text"] for q in session.questions}
+def report_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def get_report(session) -> Tuple[ReportResponse, Optional[str]]:
+    """The report for the session's current version, with its ETag.
+
+    A report is cached (and given an ETag) only once every answer has its
+    feedback and model answer; otherwise the next request retries the LLM work.
+    """
+    cached = session.report_cache
+    if cached is not None and cached[0] == session.version:
+        return cached[1], report_etag(cached[0])
+
+    # Build from a consistent copy; answers recorded meanwhile belong to the next version.
+    snapshot = session_store.snapshot(session.session_id) or session.snapshot()
+    version = snapshot.version
+    report = build_report(snapshot)
+    complete = not settings.openai_api_key or all(
+        pending_evaluation_item(record, "") is None for record in snapshot.answers.values()
+    )
+    # A write landing mid-build moves the version on; that report is already stale.
+    if complete and session_store.cache_report(session.session_id, version, report):
+        return report, report_etag(version)
+    return report, None
+
+
+_UNRELIABLE_FEEDBACK = "면접과 무관하거나 의미가 불명확한 답변으로 판단됩니다. 질문 의도에 맞게 구체적으로 답변해 주세요."
+_DEFAULT_SUMMARY_LINES = [
+    "답변 중 상당수가 질문과 무관하거나 내용이 불분명했습니다.",
+    "구체적인 역할·행동·결과를 포함해 답변의 정보량을 늘려보세요.",
+    "다음 인터뷰에서는 질문 의도를 먼저 정리한 뒤 핵심 근거로 답변해 주세요.",
+]
+
+
+def wpm_label(value: float) -> str:
+    if value <= 0:
+        return "알 수 없음"
+    if value < 120:
+        return "느림"
+    if value <= 170:
+        return "적정"
+    return "빠름"
+
+
+def iter_report_events(session, batch: Optional[bool] = None) -> Iterator[Tuple[str, Any]]:
+    """Build the report step by step, yielding each part as soon as it is known.
+
+    Events, in order:
+      ("summary", dict)       timing/WPM summary and question counts, before any LLM call
+      ("answer", AnswerTime)  one per answered question, as its evaluation completes
+      ("summary_lines", list) the three coaching lines
+    """
+    if batch is None:
+        batch = settings.report_batch_feedback
     print(
         "[report_builder]",
         "session_id=",
@@ -22,137 +71,116 @@ def build_report(session) -> ReportResponse:
         "answered=",
         len(session.answers),
     )
-    ordered_records = [
-        session.answers[qid]
-        for qid in question_text_map.keys()
-        if qid in session.answers
+    answers = [
+        session.answers[q.question_id]
+        for q in session.questions
+        if q.question_id in session.answers
     ]
-    answers = ordered_records
-
-    times: List[float] = [a.answer_seconds for a in answers]
-    wpm_values: List[float] = [a.words_per_min for a in answers if a.words_per_min > 0]
-
-    if times:
-        avg = average(times)
-        mn = min(times)
-        mx = max(times)
-        sd = std_dev(times)
-    else:
-        avg = mn = mx = sd = 0.0
-
-    average_wpm = average(wpm_values) if wpm_values else 0.0
-
-    def wpm_label(value: float) -> str:
-        if value <= 0:
-            return "알 수 없음"
-        if value < 120:
-            return "느림"
-        if value <= 170:
-            return "적정"
-        return "빠름"
 
+    stats = session.stats
     summary = {
-        "average_seconds": avg,
-        "min_seconds": mn,
-        "max_seconds": mx,
-        "std_dev_seconds": sd,
-        "average_wpm": average_wpm,
-        "average_wpm_label": wpm_label(average_wpm),
+        "average_seconds": stats.average,
+        "min_seconds": stats.minimum,
+        "max_seconds": stats.maximum,
+        "std_dev_seconds": stats.std_dev,
+        "average_wpm": stats.average_wpm,
+        "average_wpm_label": wpm_label(stats.average_wpm),
     }
+    yield "summary", {
+        "session_id": session.session_id,
+        "total_questions": len(session.questions),
+        "answered_questions": len(answers),
+        "summary": summary,
+    }
+
+    def answer_time(record) -> AnswerTime:
+        return AnswerTime(
+            question_id=record.question_id,
+            question_text=session.question_text(record.question_id) or "",
+            answer_seconds=record.answer_seconds,
+            words_per_min=record.words_per_min,
+            wpm_label=wpm_label(record.words_per_min),
+            transcript=record.transcript,
+            model_answer=record.model_answer,
+            feedback=record.feedback,
+        )
 
-    def is_unreliable_transcript(text: str) -> bool:
-        if not text:
-            return True
-        stripped = text.strip()
-        if len(stripped) < 20:
-            return True
-        if re.search(r"(.)\1{5,}", stripped):
-            return True
-        # filler checks
-        fillers = ["어쩌고", "저쩌고", "그냥", "음", "어", "아", "뭐", "몰라"]
-        if any(f * 2 in stripped for f in fillers):
-            return True
-        # token variety check
-        tokens = re.findall(r"[A-Za-z가-힣]+", stripped)
-        if len(tokens) < 6:
-            return True
-        unique_ratio = len(set(tokens)) / max(len(tokens), 1)
-        if unique_ratio < 0.5:
-            return True
-        # character variety
-        char_ratio = len(set(stripped)) / max(len(stripped), 1)
-        if char_ratio < 0.2:
-            return True
-        return False
-
-    reliable_answers = [a for a in answers if not is_unreliable_transcript(a.transcript or "")]
+    reliable_answers = [a for a in answers if a.quality.reliable]
 
     summary_lines: List[str] = session.summary_lines or []
-    if not summary_lines and reliable_answers:
-        if settings.openai_api_key:
-            try:
-                summary_lines = generate_summary_lines(summary, reliable_answers)
-                session.summary_lines = summary_lines
-            except Exception:
-                summary_lines = []
+    needs_summary = not summary_lines and bool(reliable_answers) and bool(settings.openai_api_key)
 
-    if not summary_lines:
-        summary_lines = [
-            "답변 중 상당수가 질문과 무관하거나 내용이 불분명했습니다.",
-            "구체적인 역할·행동·결과를 포함해 답변의 정보량을 늘려보세요.",
-            "다음 인터뷰에서는 질문 의도를 먼저 정리한 뒤 핵심 근거로 답변해 주세요.",
-        ]
-        session.summary_lines = summary_lines
+    pending: Dict[str, dict] = {}
 
-    answer_items: List[AnswerTime] = []
+    def settle(record) -> Iterator[Tuple[str, Any]]:
+        item = pending_evaluation_item(record, session.question_text(record.question_id) or "") if settings.openai_api_key else None
+        if item:
+            pending[record.question_id] = item
+        else:
+            yield "answer", answer_time(record)
 
+    # Answers evaluated eagerly since they were recorded only need to finish.
+    waiting = {r.question_id: r for r in answers if r.evaluation is not None and not r.evaluation.done()}
     for record in answers:
-        question_text = question_text_map.get(record.question_id, "")
-
-        if settings.openai_api_key and not record.model_answer:
-            try:
-                record.model_answer = generate_model_answer(
-                    company_id=session.company_id,
-                    job_id=session.job_id,
-                    question_text=question_text,
-                )
-            except Exception:
-                pass
-
-        unreliable = is_unreliable_transcript(record.transcript or "")
-        if unreliable and not record.feedback:
-            record.feedback = "면접과 무관하거나 의미가 불명확한 답변으로 판단됩니다. 질문 의도에 맞게 구체적으로 답변해 주세요."
-
-        if settings.openai_api_key and record.transcript and not record.feedback and not unreliable:
-            try:
-                feedback = generate_question_feedback(
-                    company_id=session.company_id,
-                    job_id=session.job_id,
-                    question_text=question_text,
-                    transcript=record.transcript,
-                )
-                record.model_answer = feedback.get("model_answer")
-                record.feedback = feedback.get("feedback")
-            except Exception:
-                pass
-
-        answer_items.append(
-            AnswerTime(
-                question_id=record.question_id,
-                question_text=question_text,
-                answer_seconds=record.answer_seconds,
-                words_per_min=record.words_per_min,
-                wpm_label=wpm_label(record.words_per_min),
-                transcript=record.transcript,
-                model_answer=record.model_answer,
-                feedback=record.feedback,
+        if not record.quality.reliable and not record.feedback:
+            session_store.save_evaluation(
+                session.session_id, record, {"feedback": _UNRELIABLE_FEEDBACK}, bump_version=False
             )
-        )
+        if record.question_id not in waiting:
+            yield from settle(record)
+    in_flight = list(waiting.values())
+    for record in iter_finished_evaluations(in_flight, timeout=settings.report_call_timeout_seconds):
+        del waiting[record.question_id]
+        yield from settle(record)
+    # Still running: the eager call's result lands through save_evaluation and is
+    # in the next report. Asking the LLM again here would pay for the answer twice.
+    for record in waiting.values():
+        yield "answer", answer_time(record)
+
+    if pending or needs_summary:
+        records = {r.question_id: r for r in answers}
+        for kind, key, value in iter_evaluations(
+            company_id=session.company_id,
+            job_id=session.job_id,
+            items=list(pending.values()),
+            summary=summary if needs_summary else None,
+            summary_answers=reliable_answers,
+            batch=batch,
+        ):
+            if kind == "answer":
+                if pending.pop(key, None) is None:
+                    continue
+                session_store.save_evaluation(session.session_id, records[key], value, bump_version=False)
+                yield "answer", answer_time(records[key])
+            elif value:
+                summary_lines = value
+                session_store.set_summary_lines(session.session_id, summary_lines)
+        # Evaluations that failed or timed out are reported without feedback.
+        for key in list(pending):
+            yield "answer", answer_time(records[key])
+
+    if not summary_lines:
+        summary_lines = list(_DEFAULT_SUMMARY_LINES)
+        session_store.set_summary_lines(session.session_id, summary_lines)
+    yield "summary_lines", summary_lines
+
+
+def build_report(session) -> ReportResponse:
+    head: Dict[str, Any] = {}
+    by_id: Dict[str, AnswerTime] = {}
+    summary_lines: List[str] = []
+    for kind, value in iter_report_events(session):
+        if kind == "summary":
+            head = value
+        elif kind == "answer":
+            by_id[value.question_id] = value
+        else:
+            summary_lines = value
 
     return ReportResponse(
-        session_id=session.session_id,
-        total_questions=len(session.questions),
-        answered_questions=len(answers),
-        summary=ReportSummary(summary_lines=summary_lines, **summary),
-        answers=answer_items,
+        session_id=head["session_id"],
+        total_questions=head["total_questions"],
+        answered_questions=head["answered_questions"],
+        summary=ReportSummary(summary_lines=summary_lines, **head["summary"]),
+        answers=[by_id[q.question_id] for q in session.questions if q.question_id in by_id],
     )
@@ -1,8 +1,10 @@
-﻿from app.core.session_store import session_store
+﻿from typing import Optional
 
+from app.core.session_store import AnswerRecord, session_store
 
-def record_answer_time(session_id: str, question_id: str, answer_seconds: float) -> None:
-    session_store.record_answer_for_session(
+
+def record_answer_time(session_id: str, question_id: str, answer_seconds: float) -> Optional[AnswerRecord]:
+    return session_store.record_answer_for_session(
         session_id=session_id,
         question_id=question_id,
         answer_seconds=answer_seconds,
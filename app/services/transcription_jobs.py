@@ -0,0 +1,295 @@
+﻿from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import queue
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.openai_client import get_openai_client
+from app.core.session_store import session_store
+from app.schemas.question import AnswerAudioResponse
+from app.services.analytics import cohort_analytics
+from app.services.answer_evaluator import schedule_answer_evaluation
+
+_LOG_DIR = Path(__file__).resolve().parents[1] / "logs"
+_ANSWER_LOG = _LOG_DIR / "answers.log"
+
+
+# How often idle workers check whether the queue was stopped.
+_POLL_SECONDS = 0.5
+
+
+class QueueFullError(Exception):
+    """Raised when the transcription queue has no room for another job."""
+
+
+class QueueStoppedError(Exception):
+    """Raised when a job is submitted after the queue was stopped for shutdown."""
+
+
+@dataclass(slots=True)
+class TranscriptionJob:
+    job_id: str
+    session_id: str
+    question_id: str
+    answer_seconds: float
+    filename: str
+    content_type: str
+    audio: Optional[bytes]
+    provider: str
+    status: str = "queued"  # queued | running | done | failed
+    error_kind: Optional[str] = None  # not_found | internal | cancelled
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    future: Future = field(default_factory=Future)
+
+    @property
+    def result(self) -> Optional[AnswerAudioResponse]:
+        if self.status != "done":
+            return None
+        return self.future.result()
+
+
+def _transcribe_openai(job: TranscriptionJob) -> Optional[str]:
+    if not settings.openai_api_key:
+        return None
+    result = get_openai_client("stt").audio.transcriptions.create(
+        model=settings.openai_stt_model,
+        file=(job.filename, job.audio, job.content_type),
+        response_format="text",
+    )
+    return str(result).strip() if result else None
+
+
+_PROVIDERS: Dict[str, Callable[[TranscriptionJob], Optional[str]]] = {
+    "openai": _transcribe_openai,
+}
+
+
+def record_audio_answer(job: TranscriptionJob, transcript: Optional[str]) -> AnswerAudioResponse:
+    """Store the transcribed answer and start its evaluation, as the synchronous endpoint did."""
+    try:
+        _LOG_DIR.mkdir(parents=True, exist_ok=True)
+        _ANSWER_LOG.open("a", encoding="utf-8").write(
+            f"[answer_audio] session_id={job.session_id} question_id={job.question_id} "
+            f"seconds={job.answer_seconds} filename={job.filename} content_type={job.content_type} "
+            f"transcript_len={len(transcript or '')}\n"
+        )
+    except Exception:
+        pass
+
+    if transcript:
+        transcript = transcript.strip()
+    word_count = len(transcript.split()) if transcript else 0
+    wpm = (word_count / (job.answer_seconds / 60)) if job.answer_seconds > 0 else 0.0
+
+    record = session_store.record_answer_for_session(
+        session_id=job.session_id,
+        question_id=job.question_id,
+        answer_seconds=job.answer_seconds,
+        transcript=transcript,
+        word_count=word_count,
+        words_per_min=wpm,
+    )
+    if record is None:
+        raise LookupError("Session not found")
+    session = session_store.get_session(job.session_id)
+    if session:
+        cohort_analytics.record_answer(session, record)
+    schedule_answer_evaluation(job.session_id, job.question_id)
+
+    return AnswerAudioResponse(
+        session_id=job.session_id,
+        question_id=job.question_id,
+        transcript=transcript,
+        answer_seconds=job.answer_seconds,
+        words_per_min=wpm,
+    )
+
+
+class TranscriptionQueue:
+    """Bounded queue of speech-to-text jobs served by a pool of worker threads.
+
+    Workers run the blocking provider call off the event loop; a semaphore per
+    provider caps how many of its requests are in flight at once, whatever the
+    pool size. Finished jobs stay queryable for `stt_job_ttl_seconds`.
+
+    stop() cancels queued jobs, waits for running ones until a single deadline,
+    and rejects new submissions. Jobs still running past the deadline finish
+    as cancelled without touching the session store.
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[TranscriptionJob]" = queue.Queue(maxsize=max(1, settings.stt_queue_size))
+        self._jobs: Dict[str, TranscriptionJob] = {}
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0, "running": 0}
+        self._stopping = threading.Event()
+        # Set once stop() gave up waiting; late results are then discarded.
+        self._abandoned = threading.Event()
+
+    def _limit(self, provider: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._limits.get(provider)
+            if semaphore is None:
+                limit = settings.stt_provider_concurrency.get(provider, settings.stt_workers)
+                semaphore = self._limits[provider] = threading.BoundedSemaphore(max(1, limit))
+            return semaphore
+
+    def _ensure_workers(self) -> None:
+        """Start the pool on first use; the caller holds the lock."""
+        if not self._workers:
+            for i in range(max(1, settings.stt_workers)):
+                worker = threading.Thread(target=self._run, name=f"stt-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _prune(self, now: float) -> None:
+        """Forget finished jobs past their TTL; the caller holds the lock."""
+        cutoff = now - settings.stt_job_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(
+        self,
+        session_id: str,
+        question_id: str,
+        answer_seconds: float,
+        audio: bytes,
+        filename: Optional[str],
+        content_type: Optional[str],
+    ) -> TranscriptionJob:
+        job = TranscriptionJob(
+            job_id=uuid.uuid4().hex,
+            session_id=session_id,
+            question_id=question_id,
+            answer_seconds=answer_seconds,
+            filename=filename or "answer.webm",
+            content_type=content_type or "audio/webm",
+            audio=audio,
+            provider=settings.stt_provider,
+        )
+        with self._lock:
+            if self._stopping.is_set():
+                raise QueueStoppedError("transcription queue is stopped")
+            self._ensure_workers()
+            self._prune(time.time())
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._counters["rejected"] += 1
+                raise QueueFullError("transcription queue is full") from None
+            self._jobs[job.job_id] = job
+            self._counters["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[TranscriptionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self._queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            self._process(job)
+
+    def _finish(self, job: TranscriptionJob, outcome: str) -> None:
+        job.finished_at = time.time()
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def _cancel(self, job: TranscriptionJob) -> None:
+        job.audio = None
+        job.error_kind = "cancelled"
+        job.status = "failed"
+        job.future.set_exception(RuntimeError("transcription cancelled by shutdown"))
+        self._finish(job, "cancelled")
+
+    def _process(self, job: TranscriptionJob) -> None:
+        job.status = "running"
+        with self._lock:
+            self._counters["running"] += 1
+        transcribe = _PROVIDERS.get(job.provider)
+        transcript = None
+        if transcribe is not None:
+            with self._limit(job.provider):
+                try:
+                    transcript = transcribe(job)
+                except Exception as exc:
+                    # A failed transcription still records the answer's timing.
+                    print(f"[transcription_jobs] stt_failed job_id={job.job_id} provider={job.provider} error={exc!r}")
+        else:
+            print(f"[transcription_jobs] unknown_provider provider={job.provider}")
+        if self._abandoned.is_set():
+            # The final session snapshot may already be written; recording now would be lost.
+            with self._lock:
+                self._counters["running"] -= 1
+            self._cancel(job)
+            return
+        # The audio is no longer needed; finished jobs keep only their result.
+        job.audio = None
+        try:
+            response = record_audio_answer(job, transcript)
+        except Exception as exc:
+            if isinstance(exc, LookupError):
+                job.error_kind = "not_found"
+            else:
+                job.error_kind = "internal"
+                print(f"[transcription_jobs] record_failed job_id={job.job_id} error={exc!r}")
+            job.status = "failed"
+            outcome = "failed"
+            job.future.set_exception(exc)
+        else:
+            job.status = "done"
+            outcome = "completed"
+            job.future.set_result(response)
+        with self._lock:
+            self._counters["running"] -= 1
+        self._finish(job, outcome)
+
+    def stop(self) -> None:
+        """Cancel queued jobs and wait, up to one shared deadline, for running ones.
+
+        Blocking; call it off the event loop.
+        """
+        deadline = time.monotonic() + settings.openai_stt_timeout_seconds
+        with self._lock:
+            self._stopping.set()
+            workers, self._workers = self._workers, []
+        cancelled = 0
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._cancel(job)
+            cancelled += 1
+        for worker in workers:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+        self._abandoned.set()
+        still_running = sum(worker.is_alive() for worker in workers)
+        if cancelled or still_running:
+            print(f"[transcription_jobs] stopped cancelled={cancelled} abandoned={still_running}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "queued": self._queue.qsize(),
+                "tracked": len(self._jobs),
+                "workers": len(self._workers),
+            }
+
+
+transcription_jobs = TranscriptionQueue()
@@ -1,4 +1,4 @@
-﻿from typing import List
+﻿from typing import Iterable, List
 
 
 def average(values: List[float]) -> float:
@@ -13,3 +13,71 @@ def std_dev(values: List[float]) -> float:
     avg = average(values)
     variance = sum((v - avg) ** 2 for v in values) / len(values)
     return variance ** 0.5
+
+
+class RunningStats:
+    """Answer-time aggregates kept up to date as answers are added or replaced.
+
+    Mean and variance use Welford's update (and its inverse for removal), so
+    reading them is O(1). Min/max only need a rescan when a removed value was
+    one of the extremes; `remove` reports that to the caller.
+    """
+
+    __slots__ = ("count", "mean", "m2", "minimum", "maximum", "wpm_sum", "wpm_count")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = 0.0
+        self.maximum = 0.0
+        self.wpm_sum = 0.0
+        self.wpm_count = 0
+
+    def add(self, value: float, wpm: float = 0.0) -> None:
+        if self.count == 0:
+            self.minimum = self.maximum = value
+        else:
+            self.minimum = min(self.minimum, value)
+            self.maximum = max(self.maximum, value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if wpm > 0:
+            self.wpm_sum += wpm
+            self.wpm_count += 1
+
+    def remove(self, value: float, wpm: float = 0.0) -> bool:
+        """Remove a previously added value; True if min/max must be recomputed."""
+        if wpm > 0:
+            self.wpm_sum -= wpm
+            self.wpm_count -= 1
+            if self.wpm_count == 0:
+                self.wpm_sum = 0.0
+        if self.count <= 1:
+            self.count = 0
+            self.mean = self.m2 = self.minimum = self.maximum = 0.0
+            return False
+        new_mean = (self.count * self.mean - value) / (self.count - 1)
+        self.m2 = max(self.m2 - (value - self.mean) * (value - new_mean), 0.0)
+        self.mean = new_mean
+        self.count -= 1
+        return value <= self.minimum or value >= self.maximum
+
+    def reset_extremes(self, values: Iterable[float]) -> None:
+        values = list(values)
+        self.minimum = min(values) if values else 0.0
+        self.maximum = max(values) if values else 0.0
+
+    @property
+    def average(self) -> float:
+        return self.mean if self.count else 0.0
+
+    @property
+    def std_dev(self) -> float:
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+
+    @property
+    def average_wpm(self) -> float:
+        return self.wpm_sum / self.wpm_count if self.wpm_count else 0.0
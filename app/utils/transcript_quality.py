@@ -0,0 +1,63 @@
+﻿from dataclasses import dataclass
+from typing import Optional
+import re
+
+_FILLERS = ["어쩌고", "저쩌고", "그냥", "음", "어", "아", "뭐", "몰라"]
+# A run of 6+ identical characters, or any filler said twice in a row.
+_NOISE_RE = re.compile(r"(?P<repeat>(.)\2{5,})|(?P<filler>" + "|".join(re.escape(f * 2) for f in _FILLERS) + ")")
+_TOKEN_RE = re.compile(r"[A-Za-z가-힣]+")
+
+MIN_CHARACTERS = 20
+MIN_TOKENS = 6
+MIN_UNIQUE_RATIO = 0.5
+MIN_CHAR_RATIO = 0.2
+
+
+@dataclass(frozen=True)
+class TranscriptQuality:
+    reliable: bool
+    length: int = 0
+    token_count: int = 0
+    unique_ratio: float = 0.0
+    char_ratio: float = 0.0
+    filler_hits: int = 0
+    repeated_run: bool = False
+
+
+_EMPTY = TranscriptQuality(reliable=False)
+
+
+def assess_transcript(text: Optional[str]) -> TranscriptQuality:
+    """Classify a transcript as usable for feedback, with the metrics behind the verdict."""
+    stripped = (text or "").strip()
+    if not stripped:
+        return _EMPTY
+
+    filler_hits = 0
+    repeated_run = False
+    for match in _NOISE_RE.finditer(stripped):
+        if match.group("repeat"):
+            repeated_run = True
+        else:
+            filler_hits += 1
+
+    tokens = _TOKEN_RE.findall(stripped)
+    unique_ratio = len(set(tokens)) / max(len(tokens), 1)
+    char_ratio = len(set(stripped)) / len(stripped)
+    reliable = (
+        len(stripped) >= MIN_CHARACTERS
+        and not repeated_run
+        and not filler_hits
+        and len(tokens) >= MIN_TOKENS
+        and unique_ratio >= MIN_UNIQUE_RATIO
+        and char_ratio >= MIN_CHAR_RATIO
+    )
+    return TranscriptQuality(
+        reliable=reliable,
+        length=len(stripped),
+        token_count=len(tokens),
+        unique_ratio=unique_ratio,
+        char_ratio=char_ratio,
+        filler_hits=filler_hits,
+        repeated_run=repeated_run,
+    )